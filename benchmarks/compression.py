@@ -0,0 +1,87 @@
+"""Bytes on the wire and latency of listing pages per content encoding.
+
+Run it against a running API, locally or through the ngrok tunnel, with a
+valid access token:
+
+    python benchmarks/compression.py --url https://api.mlsgpt.docex.io \
+        --token $ACCESS_TOKEN -o compression.json
+
+br is only served when the API was installed with the brotli extra.
+"""
+
+import json
+import time
+import argparse
+import statistics
+
+import httpx
+
+PAGES = {
+    "listings": ("/listings", dict(limit=30)),
+    "search": ("/listings/search", dict(limit=30, city=["toronto"])),
+    "search_fields": (
+        "/listings/search",
+        dict(limit=30, city=["toronto"], fields=["Price", "City", "BedroomsTotal"]),
+    ),
+    "nearby": (
+        "/listings/search-nearby",
+        dict(limit=30, address="union station, toronto"),
+    ),
+}
+ENCODINGS = ("identity", "gzip", "br")
+
+
+def fetch(client, path, payload, encoding):
+    start = time.perf_counter()
+    with client.stream(
+        "POST", path, json=payload, headers={"Accept-Encoding": encoding}
+    ) as response:
+        response.raise_for_status()
+        for _ in response.iter_raw():
+            pass
+        served = response.headers.get("content-encoding", "identity")
+        wire = response.num_bytes_downloaded
+    return served, wire, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    report = {}
+    headers = {"Authorization": f"Bearer {args.token}"}
+    with httpx.Client(base_url=args.url, headers=headers, timeout=60) as client:
+        for name, (path, payload) in PAGES.items():
+            report[name] = {}
+            for encoding in ENCODINGS:
+                # the first request fills the result cache, time the rest
+                fetch(client, path, payload, encoding)
+                runs = [
+                    fetch(client, path, payload, encoding) for _ in range(args.repeat)
+                ]
+                served, wire, _ = runs[-1]
+                report[name][encoding] = {
+                    "served": served,
+                    "bytes": wire,
+                    "latency_ms": statistics.median(r[2] for r in runs),
+                }
+
+            plain = report[name]["identity"]["bytes"]
+            for encoding, result in report[name].items():
+                print(
+                    f"{name:<14} {encoding:<9} -> {result['served']:<9}"
+                    f" {result['bytes']:>9} B ({result['bytes'] / plain:6.1%})"
+                    f" {result['latency_ms']:8.2f} ms"
+                )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""EXPLAIN (ANALYZE, BUFFERS) timings for the listing search filters.
+
+Run it against a loaded database before and after applying
+sql/add_trgm_indexes.sql and compare the two reports. The cursor cases should
+show an Index Scan on PropertyLastUpdatedKeyIndex from sql/add_timestamps.sql:
+
+    dotenv --file=.env run python benchmarks/explain_filters.py -o before.json
+    psql -f sql/add_trgm_indexes.sql
+    dotenv --file=.env run python benchmarks/explain_filters.py -o after.json
+"""
+
+import json
+import argparse
+import statistics
+from datetime import datetime
+from types import SimpleNamespace
+
+from mlsgpt.dbv2 import filters, statements, store
+
+
+def cursor(last_updated, property_id):
+    return filters.encode_cursor(
+        SimpleNamespace(LastUpdated=last_updated, property_id=property_id)
+    )
+
+
+CASES = {
+    "city": dict(City=["toronto"]),
+    "cities": dict(City=["toronto", "mississauga", "brampton"]),
+    "address": dict(Address=["queen st"]),
+    "postal_code": dict(PostalCode=["m5v"]),
+    "type_bedrooms": dict(Type=["house"], BedroomsTotal=[3, 4]),
+    "city_ownership_price": dict(
+        City=["ottawa"], OwnershipType=["condominium"], MaxPrice=800000
+    ),
+    "cursor": dict(cursor=cursor(datetime(2024, 1, 1), 2**31 - 1)),
+    "cursor_undated": dict(cursor=cursor(None, 2**31 - 1)),
+    "cursor_city": dict(
+        cursor=cursor(datetime(2024, 1, 1), 2**31 - 1), City=["toronto"]
+    ),
+}
+
+
+def statement(dialect, cursor=None, **kwargs):
+    # the statement DataReader.search runs, with this case's values bound
+    shape, params = statements.where_params(cursor, **kwargs)
+    compiled = store.listings_statement(None, shape).compile(dialect=dialect)
+    return compiled.construct_expanded_state(params | dict(limit=store.LIMIT, offset=0))
+
+
+def scans(plan):
+    nodes = [plan["Node Type"]]
+    for child in plan.get("Plans", []):
+        nodes.extend(scans(child))
+    return nodes
+
+
+def indexes(plan):
+    names = [plan["Index Name"]] if "Index Name" in plan else []
+    for child in plan.get("Plans", []):
+        names.extend(indexes(child))
+    return names
+
+
+def explain(conn, expanded):
+    row = conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {expanded.statement}",
+        expanded.parameters,
+    ).scalar_one()
+    return row[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    report = {}
+    with store.get_engine().connect() as conn:
+        for name, kwargs in CASES.items():
+            expanded = statement(conn.dialect, **kwargs)
+            runs = [explain(conn, expanded) for _ in range(args.repeat)]
+            report[name] = {
+                "planning_ms": statistics.median(r["Planning Time"] for r in runs),
+                "execution_ms": statistics.median(r["Execution Time"] for r in runs),
+                "nodes": sorted(set(scans(runs[-1]["Plan"]))),
+                "indexes": sorted(set(indexes(runs[-1]["Plan"]))),
+            }
+            print(
+                f"{name:<22} plan {report[name]['planning_ms']:8.2f} ms"
+                f"  exec {report[name]['execution_ms']:9.2f} ms"
+                f"  {', '.join(report[name]['nodes'])}"
+                f"  {', '.join(report[name]['indexes'])}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cold import time of the service modules, each in a fresh interpreter.
+
+Also lists which heavy dependencies an import pulls in and the slowest
+imports under it, from python -X importtime:
+
+    python benchmarks/import_time.py -o import_time.json
+
+The v2 API should load none of fitz, boto3, openai, googlemaps or pyngrok.
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+MODULES = ["mlsgpt.apiv2", "mlsgpt.tasks", "mlsgpt.api", "mlsgpt.cmd"]
+HEAVY = ["fitz", "requests", "boto3", "openai", "googlemaps", "pyngrok"]
+CHILD = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run(module: str) -> tuple[dict, str]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            CHILD.format(module=module, heavy=HEAVY),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def slowest(importtime: str, count: int) -> list[dict]:
+    """Third party packages by the cumulative time of their first import,
+    which includes everything they import in turn."""
+    totals = {}
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if "." in name or name.startswith(("_", "mlsgpt")):
+            continue
+        if name not in sys.stdlib_module_names:
+            totals[name] = max(totals.get(name, 0), int(cumulative))
+    ordered = sorted(totals.items(), key=lambda item: -item[1])[:count]
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in ordered]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-m", "--modules", nargs="*", default=MODULES)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-t", "--top", type=int, default=8)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    report = {}
+    for module in args.modules:
+        runs = [run(module) for _ in range(args.repeat)]
+        seconds = [r["seconds"] for r, _ in runs]
+        report[module] = {
+            "median_ms": round(statistics.median(seconds) * 1000, 1),
+            "min_ms": round(min(seconds) * 1000, 1),
+            "heavy_loaded": runs[-1][0]["loaded"],
+            "slowest": slowest(runs[-1][1], args.top),
+        }
+        result = report[module]
+        print(
+            f"{module:<16} {result['median_ms']:>8.1f} ms"
+            f"  heavy: {', '.join(result['heavy_loaded']) or '-'}"
+        )
+        for item in result["slowest"]:
+            print(f"    {item['package']:<20} {item['ms']:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
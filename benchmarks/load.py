@@ -0,0 +1,233 @@
+"""Drive every public apiv2 endpoint at a fixed concurrency and report
+throughput and p50/p95/p99 latency per endpoint.
+
+Start the API with the stand-ins first (see serve.py), then:
+
+    python benchmarks/load.py --concurrency 32 --duration 60 -o load.json
+    python benchmarks/load.py --endpoints search nearby semantic
+
+Payloads are drawn from a seeded generator over the synthetic cities, so
+runs with the same --seed send the same requests. The OAuth, metrics and
+admin endpoints are left out.
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+
+from standins import CITIES
+
+TYPES = ["apartment", "house", "row / townhouse", "duplex", "triplex"]
+PROPERTY_TYPES = ["single family", "multi-family"]
+OWNERSHIP_TYPES = ["freehold", "condominium/strata", "condominium", "leasehold"]
+STYLES = ["detached", "attached", "semi-detached", "link"]
+QUERIES = [
+    "bright renovated condo near transit",
+    "family house with backyard and garage",
+    "quiet corner unit with lake view",
+    "modern downtown apartment with balcony",
+    "spacious home near park and school",
+]
+
+
+def cities(rng, k=2):
+    return [c[0].lower() for c in rng.sample(CITIES, k)]
+
+
+def page(rng):
+    return dict(limit=rng.choice([10, 30, 50]), offset=rng.choice([0, 0, 30]))
+
+
+ENDPOINTS = {
+    "status": ("GET", "/", lambda rng: None),
+    "privacy": ("GET", "/privacy", lambda rng: None),
+    "listings": ("POST", "/listings", page),
+    "search": (
+        "POST",
+        "/listings/search",
+        lambda rng: page(rng)
+        | dict(
+            city=cities(rng, 1),
+            type=[rng.choice(TYPES)],
+            bedrooms=[rng.randint(1, 4)],
+            max_price=rng.randint(5, 20) * 100_000,
+        ),
+    ),
+    "nearby": (
+        "POST",
+        "/listings/search-nearby",
+        lambda rng: page(rng)
+        | dict(
+            address=f"{rng.randint(1, 500)} main st, {rng.choice(CITIES)[0]}",
+            distance=rng.randint(1, 3),
+        ),
+    ),
+    "semantic": (
+        "POST",
+        "/listings/semantic-search",
+        lambda rng: dict(limit=10, query=rng.choice(QUERIES)),
+    ),
+    "export": (
+        "POST",
+        "/listings/export",
+        lambda rng: dict(limit=100, city=cities(rng, 1)),
+    ),
+    "stats_info": ("GET", "/stats/info", lambda rng: None),
+    "stats_city": ("POST", "/stats/city", lambda rng: dict(city=cities(rng))),
+    "stats_type": (
+        "POST",
+        "/stats/city-type",
+        lambda rng: dict(city=cities(rng), type=rng.sample(TYPES, 2)),
+    ),
+    "stats_property_type": (
+        "POST",
+        "/stats/city-property-type",
+        lambda rng: dict(city=cities(rng), property_type=PROPERTY_TYPES),
+    ),
+    "stats_ownership_type": (
+        "POST",
+        "/stats/city-ownership-type",
+        lambda rng: dict(
+            city=cities(rng), ownership_type=rng.sample(OWNERSHIP_TYPES, 2)
+        ),
+    ),
+    "stats_construction_style": (
+        "POST",
+        "/stats/city-construction-style-attachment",
+        lambda rng: dict(
+            city=cities(rng), construction_style_attachment=rng.sample(STYLES, 2)
+        ),
+    ),
+    "stats_bedrooms": (
+        "POST",
+        "/stats/city-bedrooms-total",
+        lambda rng: dict(city=cities(rng), bedrooms=rng.sample(range(6), 3)),
+    ),
+    "stats_batch": (
+        "POST",
+        "/stats/batch",
+        lambda rng: dict(
+            city=cities(rng),
+            type=rng.sample(TYPES, 2),
+            ownership_type=rng.sample(OWNERSHIP_TYPES, 2),
+            bedrooms=rng.sample(range(6), 3),
+        ),
+    ),
+}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2),
+        "p50_ms": round(percentile(ordered, 0.50), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+    }
+
+
+async def worker(client, names, rng, token, deadline, warmup_until, results):
+    headers = {"Authorization": f"Bearer {token}"}
+    while (now := time.perf_counter()) < deadline:
+        name = rng.choice(names)
+        method, path, payload = ENDPOINTS[name]
+        start = time.perf_counter()
+        try:
+            response = await client.request(
+                method, path, json=payload(rng), headers=headers
+            )
+            await response.aread()
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if now >= warmup_until:
+            latencies, errors = results[name]
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors[0] += failed
+
+
+async def run(args) -> dict:
+    names = args.endpoints or list(ENDPOINTS)
+    results = defaultdict(lambda: ([], [0]))
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=args.timeout
+    ) as client:
+        started = time.perf_counter()
+        warmup_until = started + args.warmup
+        deadline = warmup_until + args.duration
+        await asyncio.gather(
+            *(
+                worker(
+                    client,
+                    names,
+                    random.Random(f"{args.seed}-{i}"),
+                    f"bench-user-{i % args.users}",
+                    deadline,
+                    warmup_until,
+                    results,
+                )
+                for i in range(args.concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - warmup_until
+
+    report = {}
+    for name in names:
+        latencies, errors = results[name]
+        report[name] = summarize(latencies, errors[0], elapsed)
+    everything = [latency for latencies, _ in results.values() for latency in latencies]
+    failed = sum(errors[0] for _, errors in results.values())
+    report["overall"] = summarize(everything, failed, elapsed)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-d", "--duration", type=float, default=30, help="Seconds")
+    parser.add_argument(
+        "-w", "--warmup", type=float, default=5, help="Seconds not measured"
+    )
+    parser.add_argument(
+        "-u", "--users", type=int, default=8, help="Distinct users to send as"
+    )
+    parser.add_argument("-e", "--endpoints", nargs="*", choices=list(ENDPOINTS))
+    parser.add_argument("-s", "--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(
+        f"{'endpoint':<26} {'requests':>9} {'errors':>7} {'rps':>9}"
+        f" {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, r in report.items():
+        print(
+            f"{name:<26} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f}"
+            f" {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+
+    if args.output:
+        config = {k: v for k, v in vars(args).items() if k != "output"}
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
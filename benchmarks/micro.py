@@ -0,0 +1,167 @@
+"""Micro-benchmarks of the pure Python work done per listing request.
+
+Times filter building, statement compilation, validation of ORM rows and the
+distance sort of search_nearby, without a database. Store a report per
+commit and compare them:
+
+    python benchmarks/micro.py -o before.json
+    git checkout my-branch
+    python benchmarks/micro.py -o after.json --compare before.json
+"""
+
+import sys
+import json
+import random
+import timeit
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+import h3
+from sqlalchemy.dialects import postgresql
+
+from mlsgpt.dbv2 import filters, models, schema, statements, store
+from synthetic import h3_index, listing, rooms
+
+SEARCH = dict(
+    City=["toronto", "mississauga"],
+    Type=["house"],
+    OwnershipType=["freehold"],
+    BedroomsTotal=[3, 4],
+    MaxPrice=900_000,
+)
+RESOLUTION = 10
+TORONTO = (43.6532, -79.3832)
+
+
+def properties(count: int, city: str | None = None, seed: int = 42) -> list:
+    """Transient ORM rows with their rooms and h3 cells, like a loaded page."""
+    rng = random.Random(seed)
+    now = datetime(2024, 6, 1)
+    rows, i = [], 0
+    while len(rows) < count:
+        i += 1
+        row = listing(rng, i, now)
+        if city is not None and row["City"] != city:
+            continue
+        prop = schema.Property(**row)
+        prop.Rooms = [schema.PropertyRooms(**r) for r in rooms(rng, row)]
+        prop.H3Indexes = [schema.H3Index(**h3_index(row, now))]
+        rows.append(prop)
+    return rows
+
+
+def search_statement(fields=None, **kwargs):
+    # the search statement built from scratch, without the statement cache
+    shape, _ = statements.where_params(**kwargs)
+    return store.listings_statement(fields, shape)
+
+
+def nearby_statement(fields=None, **kwargs):
+    # the nearby statement built from scratch, the ring is bound at execution
+    shape, _ = statements.where_params(**kwargs)
+    return store.nearby_statement(fields, RESOLUTION, shape)
+
+
+def cases() -> dict:
+    dialect = postgresql.dialect()
+    origin = h3.geo_to_h3(*TORONTO, RESOLUTION)
+    page = properties(store.LIMIT)
+    nearby = properties(500, city="Toronto")
+    search = search_statement(**SEARCH)
+    fields = frozenset(["Price", "City", "BedroomsTotal", "Rooms"])
+    cache = statements.StatementCache()
+
+    def cached_search():
+        # what DataReader.search does per request now
+        shape, params = statements.where_params(**SEARCH)
+        cache.get(
+            ("search", None, shape), lambda: store.listings_statement(None, shape)
+        )
+        return params
+
+    def distance(prop):
+        return h3.h3_distance(
+            origin, getattr(prop.H3Indexes[0], f"H3IndexR{RESOLUTION:02}")
+        )
+
+    return {
+        "where_params": lambda: statements.where_params(**SEARCH),
+        "nearby_template": lambda: filters.nearby_template(RESOLUTION),
+        "build_search": lambda: search_statement(**SEARCH),
+        "compile_search": lambda: search.compile(dialect=dialect),
+        "cached_search": cached_search,
+        "build_compile_search": lambda: search_statement(**SEARCH).compile(
+            dialect=dialect
+        ),
+        "build_compile_nearby": lambda: nearby_statement().compile(dialect=dialect),
+        "validate_page": lambda: [models.Property.model_validate(p) for p in page],
+        "validate_page_adapter": lambda: models.property_list_adapter(
+            None
+        ).validate_python(page, from_attributes=True),
+        "validate_page_fields": lambda: models.property_list_adapter(
+            fields
+        ).validate_python(page, from_attributes=True),
+        "nearby_sort_500": lambda: sorted(nearby, key=distance),
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    runs = sorted(t / loops * 1e6 for t in timer.repeat(repeat, loops))
+    return {
+        "loops": loops,
+        "best_us": round(runs[0], 2),
+        "median_us": round(runs[len(runs) // 2], 2),
+    }
+
+
+def revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--repeat", type=int, default=7)
+    parser.add_argument("-k", "--cases", nargs="*", help="Only run these cases")
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("--compare", default=None, help="An earlier report")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for name, fn in cases().items():
+        if args.cases and name not in args.cases:
+            continue
+        results[name] = measure(fn, args.repeat)
+        line = f"{name:<24} {results[name]['median_us']:>12.2f} us"
+        if name in baseline:
+            line += (
+                f"  ({results[name]['median_us'] / baseline[name]['median_us']:.2f}x)"
+            )
+        print(line)
+
+    if args.output:
+        report = {
+            "revision": revision(),
+            "python": sys.version.split()[0],
+            "machine": platform.machine(),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
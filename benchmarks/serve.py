@@ -0,0 +1,41 @@
+"""Serve the API with offline stand-ins for OpenAI, Google Maps and Google
+userinfo, against the database in POSTGRES_* (see synthetic.py):
+
+    POSTGRES_DB=mlsgpt_bench python benchmarks/serve.py --embed-latency 0.15
+
+Any bearer token is accepted and names its own user, so load.py can spread
+requests over as many users as it likes.
+"""
+
+import argparse
+
+import uvicorn
+
+import standins
+from mlsgpt import apiv2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--embed-latency",
+        type=float,
+        default=0.0,
+        help="Seconds each embedding takes, to mimic OpenAI",
+    )
+    parser.add_argument(
+        "--geocode-latency",
+        type=float,
+        default=0.0,
+        help="Seconds each geocode takes, to mimic Google Maps",
+    )
+    args = parser.parse_args()
+
+    standins.install(apiv2, args.embed_latency, args.geocode_latency)
+    uvicorn.run(apiv2.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
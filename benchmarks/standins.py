@@ -0,0 +1,117 @@
+"""Offline stand-ins for OpenAI, Google Maps and Google userinfo.
+
+They answer instantly (or after a fixed simulated latency) and
+deterministically, so benchmark runs are reproducible and cost nothing.
+"""
+
+import re
+import time
+import asyncio
+import hashlib
+import contextlib
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi import Request
+
+from mlsgpt.db import models
+
+EMBEDDING_DIMENSIONS = 1536
+
+# name, province, latitude, longitude
+CITIES = [
+    ("Toronto", "Ontario", 43.6532, -79.3832),
+    ("Mississauga", "Ontario", 43.5890, -79.6441),
+    ("Brampton", "Ontario", 43.7315, -79.7624),
+    ("Ottawa", "Ontario", 45.4215, -75.6972),
+    ("Hamilton", "Ontario", 43.2557, -79.8711),
+    ("London", "Ontario", 42.9849, -81.2453),
+    ("Markham", "Ontario", 43.8561, -79.3370),
+    ("Vaughan", "Ontario", 43.8361, -79.4983),
+    ("Kitchener", "Ontario", 43.4516, -80.4925),
+    ("Windsor", "Ontario", 42.3149, -83.0364),
+    ("Oakville", "Ontario", 43.4675, -79.6877),
+    ("Barrie", "Ontario", 44.3894, -79.6903),
+    ("Vancouver", "British Columbia", 49.2827, -123.1207),
+    ("Surrey", "British Columbia", 49.1913, -122.8490),
+    ("Calgary", "Alberta", 51.0447, -114.0719),
+    ("Edmonton", "Alberta", 53.5461, -113.4938),
+]
+
+
+def seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha1(text.encode()).digest()[:8], "little")
+
+
+def embed_text(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list[float]:
+    """Hashed bag of words, normalized. Texts sharing words get a positive
+    cosine similarity, so semantic search finds synthetic listings."""
+    vector = np.zeros(dimensions)
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[seed(word) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def locate(address: str) -> dict:
+    """A point near the first known city named in the address, Toronto
+    otherwise, jittered by a hash of the address."""
+    lowered = address.lower()
+    _, _, lat, lng = next((c for c in CITIES if c[0].lower() in lowered), CITIES[0])
+    jitter = np.random.default_rng(seed(lowered)).normal(0, 0.03, 2)
+    return {"lat": lat + float(jitter[0]), "lng": lng + float(jitter[1])}
+
+
+class FakeEmbeddings:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, input: str, model: str):
+        await asyncio.sleep(self.latency)
+        item = SimpleNamespace(embedding=embed_text(input))
+        return SimpleNamespace(data=[item])
+
+
+class FakeOpenAI:
+    def __init__(self, latency: float = 0.0):
+        self.embeddings = FakeEmbeddings(latency)
+
+
+class FakeGoogleMaps:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def geocode(self, address: str):
+        # called from a worker thread like the real client
+        time.sleep(self.latency)
+        return [{"geometry": {"location": locate(address)}}]
+
+
+def fake_user(request: Request) -> models.User:
+    """One user per bearer token, so admission control sees distinct users."""
+    token = request.headers.get("authorization", "bench").split()[-1]
+    return models.User(
+        sub=seed(token) % 2**31,
+        email=f"{token}@bench.local",
+        name=token,
+        email_verified=True,
+    )
+
+
+def install(apiv2, embed_latency: float = 0.0, geocode_latency: float = 0.0):
+    """Swap the external clients of apiv2's reader and its user lookup for the
+    stand-ins. The reader is created in the lifespan, so the clients are
+    replaced right after it starts."""
+    from mlsgpt import auth
+
+    lifespan = apiv2.app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan_with_standins(app):
+        async with lifespan(app):
+            apiv2.reader.clients.llm = FakeOpenAI(embed_latency)
+            apiv2.reader.clients.gmaps = FakeGoogleMaps(geocode_latency)
+            yield
+
+    apiv2.app.router.lifespan_context = lifespan_with_standins
+    apiv2.app.dependency_overrides[auth.get_current_user] = fake_user
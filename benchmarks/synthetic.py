@@ -0,0 +1,233 @@
+"""Load a reproducible synthetic dataset for the benchmarks.
+
+Fills rsbr.property, property_rooms, h3_index and embedding with --listings
+rows, then builds the stats tables from them with the same aggregates the
+real loads produce. Use a database of its own:
+
+    POSTGRES_DB=mlsgpt_bench python benchmarks/synthetic.py --listings 100000
+    POSTGRES_DB=mlsgpt_bench psql -f sql/add_trgm_indexes.sql
+
+The same --seed always gives the same data.
+"""
+
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import h3
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from mlsgpt.dbv2 import schema, store
+from standins import CITIES, embed_text
+
+TYPES = ["Apartment", "House", "Row / Townhouse", "Duplex", "Triplex"]
+PROPERTY_TYPES = ["Single Family", "Multi-family"]
+OWNERSHIP_TYPES = ["Freehold", "Condominium/Strata", "Condominium", "Leasehold"]
+STYLES = ["Detached", "Attached", "Semi-detached", "Link"]
+STREETS = ["Queen St", "King St", "Yonge St", "Main St", "Park Ave", "Lakeshore Blvd"]
+ROOMS = ["Living room", "Kitchen", "Bedroom", "Bathroom", "Den", "Family room"]
+REMARKS = (
+    "bright spacious renovated modern cozy quiet updated open concept corner "
+    "unit lake view park school transit garage backyard pool balcony fireplace "
+    "hardwood granite stainless family investment downtown suburban"
+).split()
+PROPERTY_TABLES = [schema.Property, schema.PropertyRooms, schema.H3Index]
+STATS_TABLES = {
+    schema.CityStats: None,
+    schema.CityTypeStats: "Type",
+    schema.CityPropertyTypeStats: "PropertyType",
+    schema.CityOwnershipTypeStats: "OwnershipType",
+    schema.CityConstructionStyleStats: "ConstructionStyleAttachment",
+    schema.CityBedroomsStats: "BedroomsTotal",
+}
+STATS_SQL = """
+INSERT INTO rsbr.{table} ("City", {dimension_column}
+    "InventoryCount", "AveragePrice", "MedianPrice", "MinimumPrice",
+    "MaximumPrice", "AverageDaysOnMarket", "MedianDaysOnMarket",
+    "MinimumDaysOnMarket", "MaximumDaysOnMarket", "AveragePricePerSqft")
+SELECT lower("City"), {dimension_value}
+    count(*), avg("Price"),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY "Price"),
+    min("Price"), max("Price"),
+    avg(current_date - "ListingContractDate"),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY current_date - "ListingContractDate"),
+    min(current_date - "ListingContractDate"),
+    max(current_date - "ListingContractDate"),
+    avg("Price" / nullif(split_part("SizeInterior", ' ', 1)::numeric, 0))
+FROM rsbr.property
+GROUP BY 1 {group_by}
+"""
+
+
+def listing(rng: random.Random, i: int, now: datetime) -> dict:
+    city, province, lat, lng = rng.choice(CITIES)
+    bedrooms = rng.randint(0, 5)
+    size = rng.randint(450, 4000)
+    contract = now - timedelta(days=rng.randint(1, 180))
+    updated = contract + timedelta(hours=rng.randint(0, 24 * 30))
+    return dict(
+        property_id=i,
+        PostID=i,
+        ListingID=10_000_000 + i,
+        # a few rows without a timestamp, like the real feed
+        LastUpdated=None if rng.random() < 0.02 else updated,
+        Latitude=f"{lat + rng.gauss(0, 0.05):.6f}",
+        Longitude=f"{lng + rng.gauss(0, 0.05):.6f}",
+        ListingContractDate=contract.date(),
+        OwnershipType=rng.choice(OWNERSHIP_TYPES),
+        Price=rng.randint(150, 3000) * 1000,
+        PropertyType=rng.choice(PROPERTY_TYPES),
+        PublicRemarks=" ".join(rng.choices(REMARKS, k=rng.randint(8, 30))),
+        TransactionType="For sale",
+        BathroomTotal=rng.randint(1, 4),
+        BedroomsAboveGround=bedrooms,
+        BedroomsBelowGround=0,
+        BedroomsTotal=bedrooms,
+        ConstructionStyleAttachment=rng.choice(STYLES),
+        SizeInterior=f"{size} sqft",
+        Type=rng.choice(TYPES),
+        StreetAddress=f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+        City=city,
+        Province=province,
+        PostalCode=f"{rng.choice('KLMN')}{rng.randint(1, 9)}{rng.choice('ABCEGH')}",
+        Country="Canada",
+        CommunityName=f"{city} {rng.choice(['North', 'South', 'East', 'West'])}",
+    )
+
+
+def rooms(rng: random.Random, row: dict) -> list[dict]:
+    return [
+        dict(
+            ListingID=row["ListingID"],
+            Type=rng.choice(ROOMS),
+            Width=f"{rng.randint(8, 20)} ft",
+            Length=f"{rng.randint(8, 25)} ft",
+            Level=rng.choice(["Main level", "Second level", "Basement"]),
+        )
+        for _ in range(rng.randint(3, 8))
+    ]
+
+
+def h3_index(row: dict, now: datetime) -> dict:
+    lat, lng = float(row["Latitude"]), float(row["Longitude"])
+    cells = {f"H3IndexR{r:02}": h3.geo_to_h3(lat, lng, r) for r in range(16)}
+    return dict(ListingID=row["ListingID"], CreatedAt=now, **cells)
+
+
+def embedding(row: dict, now: datetime) -> dict:
+    return dict(
+        ListingID=row["ListingID"],
+        PublicRemarks=row["PublicRemarks"],
+        Embedding=embed_text(row["PublicRemarks"]),
+        CreatedAt=now,
+    )
+
+
+def create_tables(conn, drop: bool):
+    """The mapped tables without their foreign keys, which point at the non
+    unique ListingID and are added by the sql/ scripts on real databases."""
+    conn.execute(text("CREATE SCHEMA IF NOT EXISTS rsbr"))
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    tables = [
+        model.__table__ for model in [*PROPERTY_TABLES, schema.Embedding, *STATS_TABLES]
+    ] + [schema.StatsInfo.__table__]
+    if drop:
+        for table in reversed(tables):
+            table.drop(conn, checkfirst=True)
+    for table in tables:
+        conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+        for index in table.indexes:
+            conn.execute(CreateIndex(index))
+    # the keyset index of sql/add_timestamps.sql
+    conn.execute(
+        text(
+            "CREATE INDEX PropertyLastUpdatedKeyIndex ON rsbr.property "
+            """(COALESCE("LastUpdated", '-infinity') DESC, property_id DESC)"""
+        )
+    )
+
+
+def load_listings(conn, count: int, batch: int, seed: int, embeddings: float):
+    rng = random.Random(seed)
+    now = datetime(2024, 6, 1)
+    for start in range(1, count + 1, batch):
+        rows = [
+            listing(rng, i, now) for i in range(start, min(start + batch, count + 1))
+        ]
+        conn.execute(insert(schema.Property), rows)
+        conn.execute(
+            insert(schema.PropertyRooms), [r for row in rows for r in rooms(rng, row)]
+        )
+        conn.execute(insert(schema.H3Index), [h3_index(row, now) for row in rows])
+        with_embedding = [row for row in rows if rng.random() < embeddings]
+        if with_embedding:
+            conn.execute(
+                insert(schema.Embedding),
+                [embedding(row, now) for row in with_embedding],
+            )
+        conn.commit()
+        print(f"{start + len(rows) - 1:>9} / {count} listings")
+
+
+def load_stats(conn):
+    for model, dimension in STATS_TABLES.items():
+        column = f'"{dimension}", ' if dimension else ""
+        value = (
+            f'lower("{dimension}"::text), '
+            if dimension and dimension != "BedroomsTotal"
+            else column
+        )
+        conn.execute(
+            text(
+                STATS_SQL.format(
+                    table=model.__tablename__,
+                    dimension_column=column,
+                    dimension_value=value,
+                    group_by=", 2" if dimension else "",
+                )
+            )
+        )
+
+    for column in ["City", *filter(None, STATS_TABLES.values())]:
+        conn.execute(
+            text(
+                'INSERT INTO rsbr.stats_info ("Attribute", "Values") '
+                f'SELECT :column, array_agg(DISTINCT lower("{column}"::text)) '
+                "FROM rsbr.property"
+            ),
+            {"column": column},
+        )
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--listings", type=int, default=10_000)
+    parser.add_argument("-b", "--batch", type=int, default=5_000)
+    parser.add_argument("-s", "--seed", type=int, default=42)
+    parser.add_argument(
+        "-e",
+        "--embeddings",
+        type=float,
+        default=1.0,
+        help="Share of listings with an embedding, 6 KB each",
+    )
+    parser.add_argument(
+        "--drop", action="store_true", help="Drop existing tables first"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(store.create_db_url())
+    with engine.connect() as conn:
+        create_tables(conn, args.drop)
+        conn.commit()
+        load_listings(conn, args.listings, args.batch, args.seed, args.embeddings)
+        load_stats(conn)
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    print(f"Loaded {args.listings} listings into {engine.url.database}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 import uvicorn
 
-import boto3
 import httpx
 import urllib.parse
 
@@ -39,7 +38,6 @@ app = FastAPI(
     swagger_ui_oauth2_redirect_url="/authorize",
 )
 
-sqs = boto3.client("sqs")
 reader: store.DataReader | None = None
 
 app.mount("/static", StaticFiles(directory=ASSETS_PATH), name="static")
@@ -188,10 +186,7 @@ def nl_search(params: models.ListingNaturalLanguageSearch) -> models.ListingsRes
 )
 async def extract_data(req: models.OpenAIFileIdRefs):
     for file in req.openaiFileIdRefs:
-        sqs.send_message(
-            QueueUrl=tasks.file_queue_url,
-            MessageBody=file.model_dump_json(),
-        )
+        tasks.publish_message(tasks.file_queue_url(), file.model_dump_json())
 
     return models.Message(
         OK=True,
@@ -1,24 +1,116 @@
 import os
+import asyncio
+import hashlib
 import uvicorn
+import contextlib
 
 import httpx
 import urllib.parse
 
 from pathlib import Path
+from typing import AsyncIterator
 from datetime import datetime
-from fastapi import FastAPI, Request, Depends, status
-from fastapi.responses import HTMLResponse, JSONResponse
+from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, status
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
-
-
-from mlsgpt import logger, auth, ingress, core
-from mlsgpt.dbv2 import models, store
+from fastapi.responses import FileResponse, RedirectResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+
+from mlsgpt import (
+    logger,
+    auth,
+    ingress,
+    core,
+    cache,
+    limits,
+    metrics,
+    profiler,
+    tracing,
+)
+from mlsgpt.dbv2 import models, store, filters
 
 ASSETS_PATH = Path(__file__).parent.parent / "assets"
 PRIVACY_HTML = ASSETS_PATH / "privacy.html"
 
+# responses smaller than this are sent as is, the framing costs more than it saves
+COMPRESSION_MIN_SIZE = int(os.getenv("API_COMPRESSION_MIN_SIZE", 1024))
+# gzip level, only used when brotli-asgi is not installed: its gzip fallback
+# takes no level and always compresses at 9
+COMPRESSION_LEVEL = int(os.getenv("API_COMPRESSION_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", 4))
+# clients may keep responses but must revalidate them with If-None-Match
+CACHE_CONTROL = os.getenv("API_CACHE_CONTROL", "private, no-cache")
+
+
+class ModelResponse(JSONResponse):
+    """JSON response for a model that is already validated. Returning it from a
+    handler skips FastAPI's response_model pass and lets pydantic-core write the
+    bytes directly."""
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.model_dump_json().encode("utf-8")
+
+
+def listings_response(
+    props: list,
+    params: models.BaseSearchFilters,
+    keyset: bool = True,
+    max_limit: int = store.LIMIT,
+) -> ModelResponse:
+    fields = None if params.fields is None else frozenset(params.fields)
+    with tracing.span("serialize"):
+        items = models.property_list_adapter(fields).validate_python(
+            props, from_attributes=True
+        )
+    # a short page is the last one, there is nothing after it to point to
+    full_page = props and len(props) == min(params.limit, max_limit)
+    next_cursor = filters.encode_cursor(props[-1]) if keyset and full_page else None
+    return ModelResponse(
+        models.ListingsResponse.model_construct(
+            num_items=len(items),
+            offset=params.offset,
+            items=items,
+            next_cursor=next_cursor,
+        )
+    )
+
+
+def cached_listings(key: str) -> Response | None:
+    body = result_cache.get(key)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+
+def search_filters(params: models.ListingSearchFilters) -> dict:
+    """Search filter keyword arguments, as named in the filters tables, for a
+    listing search payload."""
+    return dict(
+        StreetAddress=params.address,
+        City=params.city,
+        PostalCode=params.postal_code,
+        Province=params.province,
+        Type=params.type,
+        PropertyType=params.property_type,
+        OwnershipType=params.ownership_type,
+        ConstructionStyleAttachment=params.construction_style_attachment,
+        BedroomsTotal=params.bedrooms,
+        BathroomTotal=params.washrooms,
+        MaxPrice=params.max_price,
+        MinPrice=params.min_price,
+        MaxLease=params.max_lease,
+        MinLease=params.min_lease,
+    )
+
 
 def handle_error(e: Exception):
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -26,6 +118,50 @@ def handle_error(e: Exception):
     return JSONResponse(content=error.model_dump(), status_code=status_code)
 
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker setup, each uvicorn worker gets its own reader and pool."""
+    global reader
+    log = logger.get_logger("api-service")
+
+    reader = store.DataReader()
+    try:
+        await reader.stats.refresh()
+    except Exception as e:
+        log.error(f"Stats snapshot not loaded, retrying on first request :: {e}")
+    log.info("Data reader started")
+
+    def data_changed():
+        result_cache.invalidate()
+        reader.stats.expire()
+        log.info("Result cache invalidated")
+
+    async def reload_stats():
+        try:
+            await reader.stats.refresh(force=True)
+        except Exception as e:
+            log.error(f"Stats snapshot not reloaded :: {e}")
+
+    reloads = set()
+
+    def invalidate_caches():
+        data_changed()
+        reader.version.expire()
+        # a load was announced, rebuild the snapshot now rather than when the
+        # write counters catch up
+        task = asyncio.create_task(reload_stats())
+        reloads.add(task)
+        task.add_done_callback(reloads.discard)
+
+    reader.version.on_change = data_changed
+
+    listener = asyncio.create_task(store.listen_for_reloads(invalidate_caches, log))
+    yield
+    listener.cancel()
+    await reader.close()
+    log.info("Data reader closed")
+
+
 app = FastAPI(
     title="MLS GPT API",
     description="API for MLS property listings. This API provides access to MLS property listings and allows you to search for listings based on specific attributes.",
@@ -40,9 +176,140 @@ app = FastAPI(
         },
     ],
     swagger_ui_oauth2_redirect_url="/authorize",
+    lifespan=lifespan,
 )
 
 reader: store.DataReader | None = None
+result_cache = cache.ResultCache()
+admission = limits.AdmissionControl()
+export_admission = limits.AdmissionControl(
+    user_limit=limits.EXPORT_USER_CONCURRENCY,
+    global_limit=limits.EXPORT_GLOBAL_CONCURRENCY,
+)
+
+
+async def admitted(user=Depends(auth.get_current_user)) -> AsyncIterator[None]:
+    """Hold a concurrency slot for the user while the handler runs."""
+    async with admission.admit(user.email):
+        yield
+
+
+async def profiled(
+    request: Request, user=Depends(auth.get_current_user)
+) -> AsyncIterator[None]:
+    """Sample the request when an admin asks for it with the X-Profile header
+    or the profile query flag. The report name comes back in X-Profile-Report
+    and the report from /admin/profiles/{name}."""
+    wanted = "x-profile" in request.headers or "profile" in request.query_params
+    if not wanted or not auth.is_admin(user):
+        yield
+        return
+
+    sampler = profiler.Sampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        name = request.url.path.strip("/").replace("/", "-")
+        path = await asyncio.to_thread(sampler.save, name)
+        request.state.response_headers = {"X-Profile-Report": path.name}
+
+
+async def listings_version():
+    return await reader.version.get()
+
+
+async def stats_version():
+    snapshot = await reader.stats.get()
+    return snapshot.version
+
+
+def conditional(version):
+    """Dependency answering If-None-Match with 304 before any query runs. The
+    ETag covers the data version and the request itself, POST searches are
+    read only and validated the same way as GETs."""
+
+    async def check_etag(request: Request):
+        digest = hashlib.sha1(repr(await version()).encode())
+        digest.update(request.url.path.encode())
+        digest.update(request.url.query.encode())
+        digest.update(await request.body())
+        etag = f'W/"{digest.hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            raise HTTPException(status.HTTP_304_NOT_MODIFIED, headers=headers)
+        request.state.etag_headers = headers
+
+    return Depends(check_etag)
+
+
+listings_etag = conditional(listings_version)
+stats_etag = conditional(stats_version)
+
+# profiled first so its sample covers the other dependencies too
+LISTINGS_DEPENDENCIES = [
+    Depends(auth.get_current_user),
+    Depends(profiled),
+    listings_etag,
+    Depends(admitted),
+]
+STATS_DEPENDENCIES = [
+    Depends(auth.get_current_user),
+    Depends(profiled),
+    stats_etag,
+    Depends(admitted),
+]
+
+
+class StateHeadersMiddleware:
+    """Adds headers left in request.state by dependencies, whichever response
+    class the handler returned. ETags only go on successful responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                state = scope.get("state", {})
+                headers = MutableHeaders(scope=message)
+                headers.update(state.get("response_headers", {}))
+                if message["status"] == 200:
+                    headers.update(state.get("etag_headers", {}))
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# added first so compression wraps it
+app.add_middleware(StateHeadersMiddleware)
+
+if BrotliMiddleware is not None:
+    # br when the client accepts it, gzip otherwise. The fallback is
+    # brotli-asgi's own, at gzip level 9, API_COMPRESSION_LEVEL does not apply
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=BROTLI_QUALITY,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        compresslevel=COMPRESSION_LEVEL,
+    )
+
+# outermost, so latency includes compression
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
 
 app.mount("/static", StaticFiles(directory=ASSETS_PATH), name="static")
 templates = Jinja2Templates(ASSETS_PATH)
@@ -141,20 +408,27 @@ async def api_status():
     summary="Fetch All Listings",
     description="Retrieve all listings from the database. Returns 10 items by default and a maximum of 20. Use the limit and offset parameters to paginate the results.",
     operation_id="getAllListings",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=LISTINGS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_all_listings(params: models.BaseSearchFilters) -> models.ListingsResponse:
+    key = cache.result_key("listings", params)
+    if (response := cached_listings(key)) is not None:
+        return response
+
     try:
-        props = reader.get_properties(limit=params.limit, offset=params.offset)
+        props = await reader.get_properties(
+            limit=params.limit,
+            offset=params.offset,
+            fields=params.fields,
+            cursor=params.cursor,
+        )
     except Exception as e:
         return handle_error(e)
 
-    return models.ListingsResponse(
-        num_items=len(props),
-        offset=params.offset,
-        items=[models.Property.model_validate(prop) for prop in props],
-    )
+    response = listings_response(props, params)
+    result_cache.set(key, response.body)
+    return response
 
 
 @app.post(
@@ -163,36 +437,63 @@ async def get_all_listings(params: models.BaseSearchFilters) -> models.ListingsR
     summary="Search Listings",
     description="Search listings based on specific attributes such as address, city, province, unit type, days on market, number of bedrooms or washrooms. Returns 10 items by default and a maximum of 20. Use the limit and offset parameters to paginate the results.",
     operation_id="searchListings",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=LISTINGS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def search_listings(params: models.ListingSearchFilters):
+    key = cache.result_key("search", params)
+    if (response := cached_listings(key)) is not None:
+        return response
+
     try:
-        props = reader.search(
+        props = await reader.search(
             limit=params.limit,
             offset=params.offset,
-            StreetAddress=params.address,
-            City=params.city,
-            PostalCode=params.postal_code,
-            Province=params.province,
-            Type=params.type,
-            PropertyType=params.property_type,
-            OwnershipType=params.ownership_type,
-            ConstructionStyleAttachment=params.construction_style_attachment,
-            BedroomsTotal=params.bedrooms,
-            BathroomTotal=params.washrooms,
-            MaxPrice=params.max_price,
-            MinPrice=params.min_price,
-            MaxLease=params.max_lease,
-            MinLease=params.min_lease,
+            fields=params.fields,
+            cursor=params.cursor,
+            **search_filters(params),
         )
     except Exception as e:
         return handle_error(e)
 
-    return models.ListingsResponse(
-        num_items=len(props),
+    response = listings_response(props, params)
+    result_cache.set(key, response.body)
+    return response
+
+
+@app.post(
+    "/listings/export",
+    summary="Export Listings",
+    description="Stream every listing matching the search filters as newline delimited JSON.",
+    operation_id="exportListings",
+    include_in_schema=False,
+)
+async def export_listings(
+    params: models.ListingExportFilters, user=Depends(auth.get_current_user)
+):
+    # admitted here, after the body is validated, so a refusal is still a 429.
+    # A yield dependency would exit before the streamed body is sent, the slot
+    # is handed to the response instead, which closes it when done.
+    slot = contextlib.AsyncExitStack()
+    await slot.enter_async_context(export_admission.admit(user.email))
+    rows = reader.export(
+        limit=params.limit,
         offset=params.offset,
-        items=[models.Property.model_validate(prop) for prop in props],
+        fields=params.fields,
+        cursor=params.cursor,
+        **search_filters(params),
+    )
+
+    async def lines():
+        async with slot:
+            async for row in rows:
+                yield store.dump_row(row)
+
+    # also frees the slot when the client leaves before the first row
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(slot.aclose),
     )
 
 
@@ -202,14 +503,19 @@ async def search_listings(params: models.ListingSearchFilters):
     summary="Search Listings Nearby",
     description="Search listings based on nearby address, unit type, bedrooms or washrooms etc. Returns 10 items by default and a maximum of 30. Use the limit and offset parameters to paginate the results. You can use the resolution and distance parameters to adjust the search radius.",
     operation_id="searchNearbyListings",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=LISTINGS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def search_nearby_listings(params: models.SearchNearbyListings):
+    key = cache.result_key("search-nearby", params)
+    if (response := cached_listings(key)) is not None:
+        return response
+
     try:
-        props = reader.search_nearby(
+        props = await reader.search_nearby(
             limit=params.limit,
             offset=params.offset,
+            fields=params.fields,
             address=params.address,
             resolution=params.resolution,
             distance=params.distance,
@@ -227,11 +533,9 @@ async def search_nearby_listings(params: models.SearchNearbyListings):
     except Exception as e:
         return handle_error(e)
 
-    return models.ListingsResponse(
-        num_items=len(props),
-        offset=params.offset,
-        items=[models.Property.model_validate(prop) for prop in props],
-    )
+    response = listings_response(props, params, keyset=False)
+    result_cache.set(key, response.body)
+    return response
 
 
 @app.post(
@@ -240,27 +544,25 @@ async def search_nearby_listings(params: models.SearchNearbyListings):
     summary="Natural Language Search",
     description="Uses natural language search to find listings based on a query that describes what you're looking for. Returns 10 items by default and a maximum of 20. Use the limit and offset parameters to paginate the results. The threshold parameter can be used to adjust the similarity threshold for the search.",
     operation_id="semanticSearchListings",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=LISTINGS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def semantic_search(
     params: models.ListingNaturalLanguageSearch,
 ) -> models.ListingsResponse:
     try:
-        props = reader.semantic_search(
+        props = await reader.semantic_search(
             query=params.query,
             limit=params.limit,
             offset=params.offset,
+            fields=params.fields,
+            cursor=params.cursor,
             threshold=params.threshold,
         )
     except Exception as e:
         return handle_error(e)
 
-    return models.ListingsResponse(
-        num_items=len(props),
-        offset=params.offset,
-        items=[models.Property.model_validate(prop) for prop in props],
-    )
+    return listings_response(props, params, max_limit=store.SEMANTIC_LIMIT)
 
 
 @app.get(
@@ -269,11 +571,11 @@ async def semantic_search(
     summary="Statistics Info",
     description="Get statistics information. It returns the values that can be used to query all the statistics endpoints. Provide this information to a user to help them query the statistics endpoints.",
     operation_id="getStatsInfo",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
 )
 async def get_stats_info():
     try:
-        stats_info = reader.get_stats_info()
+        stats_info = await reader.get_stats_info()
     except Exception as e:
         return handle_error(e)
 
@@ -289,12 +591,12 @@ async def get_stats_info():
     summary="City Statistics",
     description="Get statistics for a specific city. Use lower cases for all input parameters.",
     operation_id="getCityStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_stats(params: models.CityStatsRequest):
     try:
-        stats = reader.get_city_stats(city=params.city)
+        stats = await reader.get_city_stats(city=params.city)
     except Exception as e:
         return handle_error(e)
 
@@ -310,12 +612,12 @@ async def get_city_stats(params: models.CityStatsRequest):
     summary="City Type Statistics",
     description="Get statistics for a specific city and property type. Use lower cases for all input parameters.",
     operation_id="getCityTypeStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_type_stats(params: models.CityTypeStatsRequest):
     try:
-        stats = reader.get_city_type_stats(city=params.city, type=params.type)
+        stats = await reader.get_city_type_stats(city=params.city, type=params.type)
     except Exception as e:
         return handle_error(e)
 
@@ -331,12 +633,12 @@ async def get_city_type_stats(params: models.CityTypeStatsRequest):
     summary="City Property Type Statistics",
     description="Get statistics for a specific city and property type. Use lower cases for all input parameters.",
     operation_id="getCityPropertyTypeStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_property_type_stats(params: models.CityPropertyTypeStatsRequest):
     try:
-        stats = reader.get_city_property_type_stats(
+        stats = await reader.get_city_property_type_stats(
             city=params.city, property_type=params.property_type
         )
     except Exception as e:
@@ -354,12 +656,12 @@ async def get_city_property_type_stats(params: models.CityPropertyTypeStatsReque
     summary="City Ownership Type Statistics",
     description="Get statistics for a specific city and ownership type. Use lower cases for all input parameters.",
     operation_id="getCityOwnershipTypeStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_ownership_type_stats(params: models.CityOwnershipTypeStatsRequest):
     try:
-        stats = reader.get_city_owner_type_stats(
+        stats = await reader.get_city_owner_type_stats(
             city=params.city, ownership_type=params.ownership_type
         )
     except Exception as e:
@@ -377,14 +679,14 @@ async def get_city_ownership_type_stats(params: models.CityOwnershipTypeStatsReq
     summary="City Construction Style Attachment Statistics",
     description="Get statistics for a specific city and construction style attachment. Use lower cases for all input parameters.",
     operation_id="getCityConstructionStyleAttachmentStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_construction_style_attachment_stats(
     params: models.CityConstructionStyleAttachmentStatsRequest,
 ):
     try:
-        stats = reader.get_city_construction_style_stats(
+        stats = await reader.get_city_construction_style_stats(
             city=params.city,
             construction_style_attachment=params.construction_style_attachment,
         )
@@ -406,12 +708,12 @@ async def get_city_construction_style_attachment_stats(
     summary="City Bedrooms Statistics",
     description="Get statistics for a specific city and number of bedrooms. Use lower cases for all input parameters.",
     operation_id="getCityBedroomsStats",
-    dependencies=[Depends(auth.get_current_user)],
+    dependencies=STATS_DEPENDENCIES,
     openapi_extra={"x-openai-isConsequential": False},
 )
 async def get_city_bedrooms_stats(params: models.CityBedroomsStatsRequest):
     try:
-        stats = reader.get_city_bedrooms_stats(
+        stats = await reader.get_city_bedrooms_stats(
             city=params.city, bedrooms=params.bedrooms
         )
     except Exception as e:
@@ -423,15 +725,93 @@ async def get_city_bedrooms_stats(params: models.CityBedroomsStatsRequest):
     )
 
 
-def run_app(ngrok: bool = False):
-    global reader
-    log = logger.get_logger("api-service")
+@app.post(
+    "/stats/batch",
+    response_model=models.StatsBatchResponse,
+    summary="Batch City Statistics",
+    description="Get city statistics together with any of the type, property type, ownership type, construction style attachment and bedrooms statistics in one call. Only the dimensions provided are returned. Use lower cases for all input parameters.",
+    operation_id="getStatsBatch",
+    dependencies=STATS_DEPENDENCIES,
+    openapi_extra={"x-openai-isConsequential": False},
+)
+async def get_stats_batch(params: models.StatsBatchRequest):
+    city = params.city
+    calls = {"city": reader.get_city_stats(city=city)}
+    if params.type:
+        calls["type"] = reader.get_city_type_stats(city=city, type=params.type)
+    if params.property_type:
+        calls["property_type"] = reader.get_city_property_type_stats(
+            city=city, property_type=params.property_type
+        )
+    if params.ownership_type:
+        calls["ownership_type"] = reader.get_city_owner_type_stats(
+            city=city, ownership_type=params.ownership_type
+        )
+    if params.construction_style_attachment:
+        calls["construction_style_attachment"] = (
+            reader.get_city_construction_style_stats(
+                city=city,
+                construction_style_attachment=params.construction_style_attachment,
+            )
+        )
+    if params.bedrooms:
+        calls["bedrooms"] = reader.get_city_bedrooms_stats(
+            city=city, bedrooms=params.bedrooms
+        )
+
+    # the stats lookups read the in-memory snapshot, so they can overlap
+    try:
+        results = await asyncio.gather(*calls.values())
+    except Exception as e:
+        return handle_error(e)
+
+    return models.StatsBatchResponse.model_validate(
+        {
+            name: {"num_items": len(stats), "items": stats}
+            for name, stats in zip(calls, results)
+        },
+        from_attributes=True,
+    )
 
-    reader = store.DataReader()
-    log.info("Data reader started")
+
+@app.get("/admin/profiles/{name}", operation_id="getProfile", include_in_schema=False)
+async def get_profile(name: str, user=Depends(auth.get_admin_user)):
+    path = profiler.PROFILE_DIR / name
+    if path.name != name or path.suffix != ".folded" or not path.is_file():
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain")
+
+
+@app.get("/admin/stats", operation_id="adminStats", include_in_schema=False)
+async def admin_stats(user=Depends(auth.get_admin_user)):
+    return {
+        "result_cache": result_cache.stats(),
+        "stats": reader.stats.stats(),
+        "admission": admission.stats(),
+        "export_admission": export_admission.stats(),
+        "flights": reader.flights.stats(),
+        "statements": reader.statements.stats(),
+        "compile_cache": store.compile_cache,
+    }
+
+
+@app.post(
+    "/admin/cache/invalidate", operation_id="invalidateCache", include_in_schema=False
+)
+async def invalidate_cache(user=Depends(auth.get_admin_user)):
+    """Clear the result caches of every worker after a data reload."""
+    await reader.notify_reload()
+    return {"status": "Cache invalidation requested"}
+
+
+def run_app(ngrok: bool = False, workers: int = 1):
+    log = logger.get_logger("api-service")
 
     port = int(os.environ.get("PORT", 8000))
-    log.info("API service initialized")
+    log.info(f"API service initialized with {workers} worker(s)")
+
+    metrics.start_exporter(metrics.API_METRICS_PORT)
+    log.info(f"Metrics exporter started on port {metrics.API_METRICS_PORT}")
 
     if ngrok:
         public_url = ingress.start_ngrok(port)  # Start ngrok and get the public URL
@@ -442,7 +822,11 @@ def run_app(ngrok: bool = False):
         config = uvicorn.config.LOGGING_CONFIG
         config["formatters"]["default"]["fmt"] = logger.LOG_FORMAT
         config["formatters"]["access"]["fmt"] = logger.LOG_FORMAT
-        uvicorn.run(app, host="0.0.0.0", port=port)
+        # uvicorn can only spawn workers from an import string
+        target = app if workers == 1 else "mlsgpt.apiv2:app"
+        uvicorn.run(
+            target, host="0.0.0.0", port=port, workers=workers, log_config=config
+        )
     except KeyboardInterrupt:
         ingress.stop_ngrok  # Ensure ngrok tunnel is closed when the app stops
         print("Application has been stopped.")
@@ -1,6 +1,6 @@
 import os
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2AuthorizationCodeBearer
 
 from mlsgpt import cache
@@ -15,6 +15,13 @@ TOKEN_URL = "https://oauth2.googleapis.com/token"
 REDIRECT_URI = "https://api.mlsgpt.docex.io/intermediate"
 SCOPE = "openid email profile"
 
+# comma separated emails allowed to use the admin endpoints
+ADMIN_EMAILS = {
+    email.strip()
+    for email in os.environ.get("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+
 user_info_cache = cache.UserInfoCache()
 
 oauth2_scheme = OAuth2AuthorizationCodeBearer(
@@ -27,3 +34,15 @@ oauth2_scheme = OAuth2AuthorizationCodeBearer(
 
 async def get_current_user(access_token: str = Depends(oauth2_scheme)) -> dict:
     return await user_info_cache.get_user_info(access_token)
+
+
+def is_admin(user) -> bool:
+    return user.email in ADMIN_EMAILS
+
+
+async def get_admin_user(user=Depends(get_current_user)):
+    if not is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
+        )
+    return user
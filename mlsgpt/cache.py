@@ -1,11 +1,19 @@
+import os
+import json
+import time
 import httpx
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from fastapi import HTTPException
+from pydantic import BaseModel
 
+from mlsgpt import metrics, tracing
 from mlsgpt.db import models
 from mlsgpt.dbv2 import store
 
 CACHE_EXPIRY_MINUTES = 60 * 8
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", 300))
 GOOGLE_PROFILE_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
 
 
@@ -19,11 +27,19 @@ class UserInfoCache:
         if access_token in self.cache:
             cached_data = self.cache[access_token]
             if cached_data["expiry"] > datetime.now():
+                metrics.USER_INFO_CACHE.labels("hit").inc()
                 return cached_data["data"]
 
+        metrics.USER_INFO_CACHE.labels("miss").inc()
         headers = {"Authorization": f"Bearer {access_token}"}
         async with httpx.AsyncClient() as client:
-            response = await client.get(GOOGLE_PROFILE_URL, headers=headers)
+            with (
+                metrics.external_call("google_userinfo"),
+                tracing.span("google_userinfo"),
+            ):
+                response = await client.get(GOOGLE_PROFILE_URL, headers=headers)
+            if response.status_code != 200:
+                metrics.EXTERNAL_ERRORS.labels("google_userinfo").inc()
             if response.status_code == 200:
                 user_info = response.json()
                 user = models.User(
@@ -46,3 +62,69 @@ class UserInfoCache:
                     status_code=response.status_code,
                     detail=f"Failed to fetch user information from Google: {error_details}",
                 )
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, list):
+        return sorted((normalize(v) for v in value), key=json.dumps)
+    return value
+
+
+def result_key(name: str, params: BaseModel) -> str:
+    """Cache key for a search payload, equal for requests that only differ in
+    list order or letter case."""
+    data = params.model_dump()
+    # cursors are case sensitive tokens
+    data = {k: v if k == "cursor" else normalize(v) for k, v in data.items()}
+    return f"{name}:{json.dumps(data, sort_keys=True)}"
+
+
+class ResultCache:
+    """Size bounded LRU cache with a time to live for serialized results."""
+
+    def __init__(
+        self, maxsize: int = RESULT_CACHE_SIZE, ttl: int = RESULT_CACHE_TTL_SECONDS
+    ):
+        self.cache = OrderedDict()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        item = self.cache.get(key)
+        if item is not None and item[1] > time.monotonic():
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+        if item is not None:
+            del self.cache[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value):
+        self.cache[key] = (value, time.monotonic() + self.ttl)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self):
+        self.cache.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.cache),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -11,19 +11,79 @@ def cli() -> None:
 @cli.command()
 @click.option("-n", "--ngrok", is_flag=True, help="Start ngrok tunnel", default=False)
 @click.option("-a", "--api-version", type=click.Choice(["v1", "v2"]), default="v2")
-def run_services(api_version: str, ngrok: bool) -> None:
-    from mlsgpt import api, core, tasks, apiv2
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    envvar="WEB_CONCURRENCY",
+    help="Number of v2 API worker processes",
+)
+def run_services(api_version: str, ngrok: bool, workers: int) -> None:
+    # import only the services being started, v2 needs neither boto3 nor the
+    # SQS queues the v1 task service creates
+    from mlsgpt import core
 
     if api_version == "v1":
+        from mlsgpt import api, tasks
+
         processes = [
             mp.Process(target=tasks.run_tasks),
             mp.Process(target=api.run_app, args=(ngrok,)),
         ]
     elif api_version == "v2":
-        processes = [mp.Process(target=apiv2.run_app, args=(ngrok,))]
+        from mlsgpt import apiv2
+
+        processes = [mp.Process(target=apiv2.run_app, args=(ngrok, workers))]
 
     for p in processes:
         p.start()
         time.sleep(5)
 
     core.keep_alive(processes)
+
+
+@cli.command()
+def notify_reload() -> None:
+    """Tell every running API worker that the listing data was reloaded."""
+    from mlsgpt.dbv2 import store
+
+    store.notify_reload()
+
+
+@cli.command()
+@click.option("-o", "--output", type=click.File("w"), default="-")
+@click.option("-c", "--city", multiple=True, help="City to filter by, repeatable")
+@click.option("-p", "--province", multiple=True, help="Province to filter by")
+@click.option("-t", "--type", "type_", multiple=True, help="Unit type to filter by")
+@click.option("-f", "--fields", multiple=True, help="Listing field to export")
+@click.option("-l", "--limit", type=click.IntRange(min=1), default=None)
+@click.option(
+    "-b",
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=1000,
+    envvar="EXPORT_BATCH_SIZE",
+    help="Rows fetched per round trip",
+)
+def export_listings(
+    output, city, province, type_, fields, limit: int, batch_size: int
+) -> None:
+    """Write listings as newline delimited JSON."""
+    import asyncio
+    from mlsgpt.dbv2 import store
+
+    async def export():
+        async with store.DataReader() as reader:
+            rows = reader.export(
+                limit=limit,
+                fields=list(fields) or None,
+                batch_size=batch_size,
+                City=list(city) or None,
+                Province=list(province) or None,
+                Type=list(type_) or None,
+            )
+            async for row in rows:
+                output.write(store.dump_row(row))
+
+    asyncio.run(export())
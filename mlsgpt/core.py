@@ -1,11 +1,9 @@
 import os
 import sys
 import time
-import fitz
 import httpx
 import base64
 import tempfile
-import requests
 import multiprocessing
 
 
@@ -20,6 +18,8 @@ def download_file(url: str, filename: str) -> None:
         url (str): URL of PDF
         filename (str): Filename to save PDF
     """
+    import requests
+
     with requests.get(url, stream=True) as r:
         r.raise_for_status()
         with open(filename, 'wb') as f:
@@ -37,6 +37,8 @@ def convert_pdf2png(filename: str) -> list[str]:
     Returns:
         list[str]: List of images
     """
+    import fitz
+
     pages = fitz.open(filename, filetype="pdf")
     images = []
     for page in pages:
@@ -1,13 +1,14 @@
 import os
+import sys
 import json
+import time
 
 import psycopg
-from openai import OpenAI
 from pgvector.psycopg import register_vector
 from psycopg import sql
 import psycopg.rows
 
-from mlsgpt import logger, constants
+from mlsgpt import logger, constants, querylog
 
 from decimal import Decimal
 
@@ -16,7 +17,7 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
-def create_pg_connection(database: str = "postgres"):
+def create_pg_connection(database: str = "postgres", cursor_factory=psycopg.Cursor):
     return psycopg.connect(
         host=os.environ.get("POSTGRES_HOST"),
         port=os.environ.get("POSTGRES_PORT"),
@@ -24,21 +25,51 @@ def create_pg_connection(database: str = "postgres"):
         password=os.environ.get("POSTGRES_PASSWORD"),
         dbname=database,
         autocommit=True,
+        cursor_factory=cursor_factory,
     )
 
 
+def explain(statement: str, params) -> list[str]:
+    with create_pg_connection(database=os.environ.get("POSTGRES_DB")) as conn:
+        register_vector(conn)
+        return [row[0] for row in conn.execute(statement, params)]
+
+
+class TimedCursor(psycopg.Cursor):
+    """Cursor that hands statements slower than querylog.SLOW_QUERY_MS to
+    querylog, tagged with the DataIO method that ran them."""
+
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if querylog.is_slow(elapsed):
+                if isinstance(query, sql.Composable):
+                    query = query.as_string(self)
+                caller = sys._getframe(1).f_code.co_qualname
+                querylog.report(query, params, elapsed, caller, explain)
+
+
 class DataIO(object):
     def __init__(self, mode:str="r", log: logger.logging.Logger|None = None):
         self.log = log or logger.get_logger("results-table")
         if mode == "r":
-            self.conn = create_pg_connection(database=os.environ.get("POSTGRES_DB"))
+            self.conn = create_pg_connection(
+                database=os.environ.get("POSTGRES_DB"), cursor_factory=TimedCursor
+            )
             self.cursor = self.conn.cursor(row_factory=psycopg.rows.dict_row)
         elif mode == "w":
             self.create_database()
-            self.conn = create_pg_connection(database=os.environ.get("POSTGRES_DB"))
+            self.conn = create_pg_connection(
+                database=os.environ.get("POSTGRES_DB"), cursor_factory=TimedCursor
+            )
             self.cursor = self.conn.cursor(row_factory=psycopg.rows.dict_row)
             self.create_schema()
             self.create_table()
+        from openai import OpenAI
+
         self.llm = OpenAI()
 
     def create_database(self):
@@ -1,114 +1,153 @@
-from sqlalchemy import or_
+import json
+import base64
+import operator
+from datetime import datetime
+from sqlalchemy import (
+    String,
+    any_,
+    bindparam,
+    func,
+    literal_column,
+    or_,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from mlsgpt.dbv2 import schema
 
+# listings without LastUpdated sort as -infinity, after every dated one in
+# descending order, so the keyset ordering and cursor need no NULL branch
+NEGATIVE_INFINITY = literal_column("'-infinity'")
+LAST_UPDATED = func.coalesce(schema.Property.LastUpdated, NEGATIVE_INFINITY)
 
-def filter_props(key, value):
-    condition = None
-    match key:
-        case "MaxPrice":
-            condition = schema.Property.Price <= value
-        case "MinPrice":
-            condition = schema.Property.Price >= value
-        case "MaxLease":
-            condition = schema.Property.Lease <= value
-        case "MinLease":
-            condition = schema.Property.Lease >= value
-        case "Address":
-            condition = or_(
-                *[
-                    schema.Property.StreetAddress.ilike(f"%{address}%")
-                    for address in value
-                ]
-            )
-        case "City":
-            condition = or_(
-                *[schema.Property.City.ilike(f"%{city}%") for city in value]
-            )
-        case "PostalCode":
-            condition = or_(
-                *[
-                    schema.Property.PostalCode.ilike(f"%{post_code}%")
-                    for post_code in value
-                ]
-            )
-        case "Province":
-            condition = or_(
-                *[schema.Property.Province.ilike(f"%{province}%") for province in value]
-            )
-        case "Type":
-            condition = or_(
-                *[schema.Property.Type.ilike(f"%{type}%") for type in value]
-            )
-        case "PropertyType":
-            condition = or_(
-                *[
-                    schema.Property.PropertyType.ilike(f"%{property_type}%")
-                    for property_type in value
-                ]
-            )
-        case "OwnershipType":
-            condition = or_(
-                *[
-                    schema.Property.OwnershipType.ilike(f"%{ownership_type}%")
-                    for ownership_type in value
-                ]
-            )
-        case "ConstructionStyleAttachment":
-            condition = or_(
-                *[
-                    schema.Property.ConstructionStyleAttachment.ilike(
-                        f"%{construction_style}%"
-                    )
-                    for construction_style in value
-                ]
-            )
-        case "BedroomsTotal":
-            condition = or_(
-                *[schema.Property.BedroomsTotal == bedrooms for bedrooms in value]
-            )
-        case "BathroomTotal":
-            condition = or_(
-                *[schema.Property.BathroomTotal == bathrooms for bathrooms in value]
-            )
-        case _:
-            raise ValueError(f"Invalid filter key :: {key}")
-    return condition
-
-
-def filter_nearby(resolution, values):
-    match resolution:
-        case 0:
-            condition = schema.H3Index.H3IndexR00.in_(values)
-        case 1:
-            condition = schema.H3Index.H3IndexR01.in_(values)
-        case 2:
-            condition = schema.H3Index.H3IndexR02.in_(values)
-        case 3:
-            condition = schema.H3Index.H3IndexR03.in_(values)
-        case 4:
-            condition = schema.H3Index.H3IndexR04.in_(values)
-        case 5:
-            condition = schema.H3Index.H3IndexR05.in_(values)
-        case 6:
-            condition = schema.H3Index.H3IndexR06.in_(values)
-        case 7:
-            condition = schema.H3Index.H3IndexR07.in_(values)
-        case 8:
-            condition = schema.H3Index.H3IndexR08.in_(values)
-        case 9:
-            condition = schema.H3Index.H3IndexR09.in_(values)
-        case 10:
-            condition = schema.H3Index.H3IndexR10.in_(values)
-        case 11:
-            condition = schema.H3Index.H3IndexR11.in_(values)
-        case 12:
-            condition = schema.H3Index.H3IndexR12.in_(values)
-        case 13:
-            condition = schema.H3Index.H3IndexR13.in_(values)
-        case 14:
-            condition = schema.H3Index.H3IndexR14.in_(values)
-        case 15:
-            condition = schema.H3Index.H3IndexR15.in_(values)
-        case _:
-            raise ValueError(f"Invalid resolution :: {resolution}")
-    return condition
+TEXT_FILTERS = {
+    "Address": schema.Property.StreetAddress,
+    "StreetAddress": schema.Property.StreetAddress,
+    "City": schema.Property.City,
+    "PostalCode": schema.Property.PostalCode,
+    "Province": schema.Property.Province,
+    "Type": schema.Property.Type,
+    "PropertyType": schema.Property.PropertyType,
+    "OwnershipType": schema.Property.OwnershipType,
+    "ConstructionStyleAttachment": schema.Property.ConstructionStyleAttachment,
+}
+LIST_FILTERS = {
+    "BedroomsTotal": schema.Property.BedroomsTotal,
+    "BathroomTotal": schema.Property.BathroomTotal,
+}
+RANGE_FILTERS = {
+    "MaxPrice": (schema.Property.Price, operator.le),
+    "MinPrice": (schema.Property.Price, operator.ge),
+    "MaxLease": (schema.Property.Lease, operator.le),
+    "MinLease": (schema.Property.Lease, operator.ge),
+}
+
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def value_list(values):
+    if isinstance(values, str):
+        return [values]
+    return [value for value in values if value is not None]
+
+
+def like_terms(values):
+    terms = sorted({escape_like(v.strip().lower()) for v in value_list(values)})
+    return [term for term in terms if term]
+
+
+def filter_params(key, value):
+    """Bind parameter values of a search filter. A statement built by
+    filter_template(key, len(params)) takes them whatever the values are."""
+    if key in TEXT_FILTERS:
+        terms = like_terms(value)
+        return {f"{key}_{i}": f"%{term}%" for i, term in enumerate(terms, 1)}
+    if key in LIST_FILTERS:
+        return {f"{key}_1": sorted(set(value))}
+    if key in RANGE_FILTERS:
+        return {f"{key}_1": value}
+    raise ValueError(f"Invalid filter key :: {key}")
+
+
+def filter_template(key, size):
+    """The condition of a search filter with bind parameters in place of the
+    values, size is the number of parameters the filter takes."""
+    if key in TEXT_FILTERS:
+        # case insensitive substring match against any of the terms. Each is a
+        # plain ILIKE the column's pg_trgm GIN index can serve, and the OR-ed
+        # index scans are combined with a BitmapOr. like_terms drops blank
+        # terms, '%%' matches every row and forces a sequential scan.
+        column = TEXT_FILTERS[key]
+        if not size:
+            return true()
+        return or_(
+            *[
+                column.ilike(bindparam(f"{key}_{i}", type_=String), escape="\\")
+                for i in range(1, size + 1)
+            ]
+        )
+    if key in LIST_FILTERS:
+        return LIST_FILTERS[key].in_(bindparam(f"{key}_1", expanding=True))
+    if key in RANGE_FILTERS:
+        column, compare = RANGE_FILTERS[key]
+        return compare(column, bindparam(f"{key}_1", type_=column.type))
+    raise ValueError(f"Invalid filter key :: {key}")
+
+
+def nearby_template(resolution):
+    """Listings whose h3 cell at the resolution is one of the ring's cells,
+    taken as one array parameter so the statement text stays the same however
+    many cells the ring has."""
+    column = getattr(schema.H3Index, f"H3IndexR{resolution:02}", None)
+    if column is None:
+        raise ValueError(f"Invalid resolution :: {resolution}")
+    return column == any_(bindparam("cells", type_=ARRAY(String)))
+
+
+def encode_cursor(prop):
+    """Opaque keyset cursor pointing just after the given listing."""
+    last_updated = prop.LastUpdated and prop.LastUpdated.isoformat()
+    data = json.dumps([last_updated, prop.property_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        last_updated, property_id = json.loads(base64.urlsafe_b64decode(cursor))
+        if last_updated is not None:
+            last_updated = datetime.fromisoformat(last_updated)
+    except Exception:
+        raise ValueError(f"Invalid cursor :: {cursor}")
+    if not isinstance(property_id, int):
+        raise ValueError(f"Invalid cursor :: {cursor}")
+    return last_updated, property_id
+
+
+def rows_after(last_updated, property_id):
+    """Listings after (last_updated, property_id) in LAST_UPDATED_DESC order, as
+    one row comparison on the expression index, so Postgres seeks to the
+    cursor and reads the page in index order."""
+    return tuple_(LAST_UPDATED, schema.Property.property_id) < tuple_(
+        last_updated, property_id
+    )
+
+
+def after_params(cursor):
+    last_updated, property_id = decode_cursor(cursor)
+    params = {"after_property_id": property_id}
+    if last_updated is not None:
+        params["after_last_updated"] = last_updated
+    return params
+
+
+def after_template(size):
+    """Listings after a cursor, size is len(after_params(cursor))."""
+    property_id = bindparam("after_property_id", type_=schema.Property.property_id.type)
+    if size == 1:
+        return rows_after(NEGATIVE_INFINITY, property_id)
+    last_updated = bindparam(
+        "after_last_updated", type_=schema.Property.LastUpdated.type
+    )
+    return rows_after(last_updated, property_id)
@@ -0,0 +1,50 @@
+import asyncio
+import functools
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight call and all
+    get its result or its exception. Nothing is kept once the call is done."""
+
+    def __init__(self):
+        self.calls: dict[str, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def finish(self, key: str, future: asyncio.Future):
+        self.calls.pop(key, None)
+        # every waiter may have been cancelled, don't warn about the exception
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: str, fn, *args, **kwargs):
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn(*args, **kwargs))
+            future.add_done_callback(functools.partial(self.finish, key))
+            self.calls[key] = future
+            self.started += 1
+        else:
+            self.shared += 1
+        # a caller going away must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "started": self.started,
+            "shared": self.shared,
+        }
+
+
+def coalesced(method):
+    """Share identical concurrent calls of a DataReader method across
+    requests: the geocode and embedding calls as well as the SQL queries,
+    which open a session of their own through DataReader.begin_session."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = repr((method.__name__, args, sorted(kwargs.items())))
+        return await self.flights.do(key, method, self, *args, **kwargs)
+
+    return wrapper
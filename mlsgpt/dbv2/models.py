@@ -1,5 +1,23 @@
+import os
+import functools
 from typing import List
-from pydantic import BaseModel, Field, ConfigDict
+from datetime import date, datetime
+from pydantic import (
+    BaseModel,
+    Field,
+    ConfigDict,
+    TypeAdapter,
+    create_model,
+    field_validator,
+)
+
+from mlsgpt.dbv2 import filters
+
+# heavy fields left out of listings unless asked for, these match the
+# deferred columns on schema.Property
+DEFERRED_FIELDS = ("AlternateURL",)
+# field sets come from clients, so only the most recent ones keep an adapter
+ADAPTER_CACHE_SIZE = int(os.getenv("PROPERTY_ADAPTER_CACHE_SIZE", 256))
 
 
 class PropertyRooms(BaseModel):
@@ -19,7 +37,7 @@ class Property(BaseModel):
 
     PostID: int | None = Field(..., description="Post ID")
     ListingID: int | None = Field(..., description="Listing ID")
-    LastUpdated: str | None = Field(..., description="Last Updated")
+    LastUpdated: datetime | None = Field(..., description="Last Updated")
     Latitude: str | None = Field(..., description="Latitude")
     Longitude: str | None = Field(..., description="Longitude")
     AmenitiesNearBy: str | None = Field(
@@ -28,7 +46,7 @@ class Property(BaseModel):
     CommunityFeatures: str | None = Field(..., description="Community Features")
     Features: str | None = Field(..., description="Features")
     Lease: float | None = Field(..., description="Lease")
-    ListingContractDate: str | None = Field(..., description="Listing Contract Date")
+    ListingContractDate: date | None = Field(..., description="Listing Contract Date")
     LocationDescription: str | None = Field(..., description="Location Description")
     MaintenanceFee: str | None = Field(..., description="Maintenance Fee")
     ManagementCompany: str | None = Field(..., description="Management Company")
@@ -85,6 +103,26 @@ class Property(BaseModel):
     Rooms: List[PropertyRooms] | None = Field(..., description="Rooms")
 
 
+@functools.lru_cache(maxsize=ADAPTER_CACHE_SIZE)
+def property_list_adapter(fields: frozenset[str] | None = None) -> TypeAdapter:
+    """Adapter that validates a page of ORM rows in a single call, trimmed to
+    the requested fields. Built once per field set, the least recently used
+    ones are dropped past ADAPTER_CACHE_SIZE."""
+    if fields is None:
+        fields = frozenset(Property.model_fields) - frozenset(DEFERRED_FIELDS)
+
+    model = create_model(
+        "Property",
+        __config__=ConfigDict(from_attributes=True),
+        **{
+            name: (info.annotation, info)
+            for name, info in Property.model_fields.items()
+            if name in fields
+        },
+    )
+    return TypeAdapter(list[model])
+
+
 class CityStats(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -219,6 +257,31 @@ class BaseSearchFilters(BaseModel):
         0,
         description="The offset for paginating the results. Default is 0. Use this to paginate the results.",
     )
+    cursor: str | None = Field(
+        None,
+        description="The next_cursor value from a previous response. Use it instead of offset to fetch the next page quickly. Not supported by nearby search.",
+    )
+    fields: list[str] = Field(
+        None,
+        description="A list of listing fields to return (e.g. StreetAddress, City, Price). Returns every field except AlternateURL by default. Ask only for the fields you need to keep responses small.",
+        json_schema_extra={
+            "examples": [["StreetAddress", "City", "Price", "BedroomsTotal"]]
+        },
+    )
+
+    @field_validator("fields")
+    def check_fields(cls, v):
+        if v is not None:
+            unknown = set(v) - set(Property.model_fields)
+            if unknown:
+                raise ValueError(f"Invalid fields :: {', '.join(sorted(unknown))}")
+        return v
+
+    @field_validator("cursor")
+    def check_cursor(cls, v):
+        if v is not None:
+            filters.decode_cursor(v)
+        return v
 
 
 class BaseSearchFieldFilters(BaseSearchFilters):
@@ -302,6 +365,14 @@ class ListingSearchFilters(BaseSearchFieldFilters):
     )
 
 
+class ListingExportFilters(ListingSearchFilters):
+    limit: int | None = Field(
+        None,
+        ge=1,
+        description="The number of listings to export. Exports all by default",
+    )
+
+
 class SearchNearbyListings(BaseSearchFieldFilters):
     address: str = Field(
         None, description="The address to use for searching nearby listings"
@@ -328,6 +399,10 @@ class ListingsResponse(BaseModel):
     num_items: int = Field(..., description="Number of items returned")
     items: list[Property] = Field(..., description="List of listings returned")
     offset: int = Field(..., description="The offset for paginating the results")
+    next_cursor: str | None = Field(
+        None,
+        description="Pass this as cursor to fetch the next page. Empty when there are no more results.",
+    )
 
 
 class ErrorResponse(BaseModel):
@@ -457,3 +532,48 @@ class CityConstructionStyleAttachmentStatsResponse(BaseModel):
         ...,
         description="List of city construction style attachment statistics returned",
     )
+
+
+class StatsBatchRequest(BaseModel):
+    city: list[str] = Field(..., description="A list of cities to fetch statistics for")
+    type: list[str] | None = Field(
+        None, description="A list of types to fetch statistics for"
+    )
+    property_type: list[str] | None = Field(
+        None, description="A list of property types to fetch statistics for"
+    )
+    ownership_type: list[str] | None = Field(
+        None, description="A list of ownership types to fetch statistics for"
+    )
+    construction_style_attachment: list[str] | None = Field(
+        None,
+        description="A list of construction style attachments to fetch statistics for",
+    )
+    bedrooms: list[int] | None = Field(
+        None, description="A list of bedrooms to fetch statistics for"
+    )
+
+
+class StatsBatchResponse(BaseModel):
+    city: CityStatsResponse = Field(..., description="City statistics")
+    type: CityTypeStatsResponse | None = Field(
+        None, description="City type statistics, when types were requested"
+    )
+    property_type: CityPropertyTypeStatsResponse | None = Field(
+        None,
+        description="City property type statistics, when property types were requested",
+    )
+    ownership_type: CityOwnershipTypeStatsResponse | None = Field(
+        None,
+        description="City ownership type statistics, when ownership types were requested",
+    )
+    construction_style_attachment: (
+        CityConstructionStyleAttachmentStatsResponse | None
+    ) = Field(
+        None,
+        description="City construction style attachment statistics, when construction style attachments were requested",
+    )
+    bedrooms: CityBedroomsStatsResponse | None = Field(
+        None,
+        description="City bedrooms statistics, when bedrooms were requested",
+    )
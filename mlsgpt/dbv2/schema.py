@@ -1,4 +1,4 @@
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy import (
     Column,
     Integer,
@@ -7,6 +7,7 @@ from sqlalchemy import (
     LargeBinary,
     ForeignKey,
     DateTime,
+    Date,
     Boolean,
     ARRAY,
 )
@@ -23,14 +24,14 @@ class Property(Base):
     property_id = Column(Integer, primary_key=True)
     PostID = Column(Integer)
     ListingID = Column(Integer, index=True)
-    LastUpdated = Column(String)
+    LastUpdated = Column(DateTime)
     Latitude = Column(String)
     Longitude = Column(String)
     AmenitiesNearBy = Column(String, name="AmmenitiesNearBy")
     CommunityFeatures = Column(String)
     Features = Column(String)
     Lease = Column(Numeric(38, 2))
-    ListingContractDate = Column(String)
+    ListingContractDate = Column(Date)
     LocationDescription = Column(String)
     MaintenanceFee = Column(String)
     ManagementCompany = Column(String)
@@ -81,9 +82,10 @@ class Property(Base):
     CommunityName = Column(String, index=True)
     CustomListing = Column(Integer)
     Sold = Column(Integer)
-    AlternateURL = Column(LargeBinary)
-    Rooms = relationship("PropertyRooms", back_populates="Property")
-    H3Indexes = relationship("H3Index", back_populates="Property")
+    AlternateURL = deferred(Column(LargeBinary))
+    # loaded explicitly per query in dbv2.store, lazy loads would be N+1
+    Rooms = relationship("PropertyRooms", back_populates="Property", lazy="raise")
+    H3Indexes = relationship("H3Index", back_populates="Property", lazy="raise")
     # Embedding = relationship("Embedding", back_populates="Property")
     # Offices = Column(String, index=True)
     # Agents = Column(String, index=True)
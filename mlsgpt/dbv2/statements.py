@@ -0,0 +1,82 @@
+import os
+from collections import OrderedDict
+
+from sqlalchemy import bindparam
+
+from mlsgpt import metrics
+from mlsgpt.dbv2 import filters
+
+STATEMENT_CACHE_SIZE = int(os.getenv("STATEMENT_CACHE_SIZE", 256))
+
+LIMIT = bindparam("limit")
+OFFSET = bindparam("offset")
+
+
+class StatementCache:
+    """Listing statements built once per shape: the method, the requested
+    fields and which filters are set with how many terms. The values go in as
+    bind parameters, so every request of a shape reuses one statement object,
+    whose SQLAlchemy cache key is computed once and whose compiled form stays
+    in the engine's compiled cache."""
+
+    def __init__(self, maxsize: int = STATEMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, build):
+        statement = self.statements.get(key)
+        if statement is not None:
+            self.statements.move_to_end(key)
+            self.hits += 1
+            metrics.STATEMENT_CACHE.labels("hit").inc()
+            return statement
+
+        self.misses += 1
+        metrics.STATEMENT_CACHE.labels("miss").inc()
+        statement = self.statements[key] = build()
+        if len(self.statements) > self.maxsize:
+            self.statements.popitem(last=False)
+        return statement
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.statements),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def where_params(cursor: str | None = None, **kwargs) -> tuple[tuple, dict]:
+    """The shape and the bind parameters of a cursor and search filters.
+    Filters set to None are left out."""
+    shape, params = [], {}
+    if cursor is not None:
+        after = filters.after_params(cursor)
+        shape.append(("after", len(after)))
+        params |= after
+
+    for key, value in kwargs.items():
+        if value is None:
+            continue
+        bound = filters.filter_params(key, value)
+        shape.append((key, len(bound)))
+        params |= bound
+    return tuple(shape), params
+
+
+def where_clauses(shape: tuple) -> list:
+    return [
+        (
+            filters.after_template(size)
+            if key == "after"
+            else filters.filter_template(key, size)
+        )
+        for key, size in shape
+    ]
+
+
+def fields_key(fields: list[str] | None):
+    return None if fields is None else frozenset(fields)
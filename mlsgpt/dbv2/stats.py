@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy import BigInteger, Integer, String, column, select, table, tuple_
+
+from mlsgpt.dbv2 import schema
+
+STATS_CHECK_INTERVAL = float(os.environ.get("STATS_CHECK_INTERVAL_SECONDS", 60))
+
+# stats table -> column the endpoints filter on besides the city
+DIMENSIONS = {
+    schema.CityStats: None,
+    schema.CityTypeStats: "Type",
+    schema.CityPropertyTypeStats: "PropertyType",
+    schema.CityOwnershipTypeStats: "OwnershipType",
+    schema.CityConstructionStyleStats: "ConstructionStyleAttachment",
+    schema.CityBedroomsStats: "BedroomsTotal",
+}
+TABLES = (schema.StatsInfo, *DIMENSIONS)
+# cumulative write counters per table, kept by Postgres for every table
+PG_STAT_USER_TABLES = table(
+    "pg_stat_user_tables",
+    column("relid", Integer),
+    column("schemaname", String),
+    column("relname", String),
+    column("n_tup_ins", BigInteger),
+    column("n_tup_upd", BigInteger),
+    column("n_tup_del", BigInteger),
+)
+
+
+def write_counters(models):
+    """relid and insert, update and delete counts of the models' tables. Any
+    write changes them, and a table that is dropped and created again comes
+    back with a new relid. Counters are flushed when the writing transaction
+    ends, so they may trail a commit by a moment."""
+    stat = PG_STAT_USER_TABLES.c
+    return select(stat.relid, stat.n_tup_ins, stat.n_tup_upd, stat.n_tup_del).where(
+        tuple_(stat.schemaname, stat.relname).in_(
+            [(model.__table__.schema, model.__table__.name) for model in models]
+        )
+    )
+
+
+def normalize(value):
+    return value.strip().lower() if isinstance(value, str) else value
+
+
+def contains(key, terms: list[str]) -> bool:
+    return key is not None and any(term in key for term in terms)
+
+
+class Snapshot:
+    """Immutable copy of the stats tables, rows grouped by normalized city and
+    dimension value."""
+
+    def __init__(self, version: tuple, rows: dict):
+        self.version = version
+        self.info = rows[schema.StatsInfo]
+        self.index = {}
+        for model, dimension in DIMENSIONS.items():
+            index = defaultdict(lambda: defaultdict(list))
+            for row in rows[model]:
+                key = normalize(getattr(row, dimension)) if dimension else None
+                index[normalize(row.City)][key].append(row)
+            self.index[model] = {city: dict(values) for city, values in index.items()}
+
+    def lookup(self, model, city: list[str], values: list | None = None):
+        """Same matches as the former `ilike '%term%'` queries: substring for
+        city and text dimensions, equality for bedrooms."""
+        cities = [normalize(c) for c in city]
+        dimension = DIMENSIONS[model]
+        if dimension == "BedroomsTotal":
+            match = lambda key: key in values
+        elif dimension:
+            terms = [normalize(v) for v in values]
+            match = lambda key: contains(key, terms)
+        else:
+            match = lambda key: True
+
+        return [
+            row
+            for name, groups in self.index[model].items()
+            if contains(name, cities)
+            for key, rows in groups.items()
+            if match(key)
+            for row in rows
+        ]
+
+
+class StatsCache:
+    """Serves the stats endpoints from memory. The snapshot is swapped in one
+    assignment, so readers never see a half loaded copy."""
+
+    def __init__(self, Session, check_interval: float = STATS_CHECK_INTERVAL):
+        self.Session = Session
+        self.check_interval = check_interval
+        self.snapshot: Snapshot | None = None
+        self.checked_at = 0.0
+        self.reloads = 0
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def version_query():
+        # a reload notification sent right after a load forces the refresh,
+        # whether or not the counters have caught up
+        return write_counters(TABLES)
+
+    def is_fresh(self) -> bool:
+        return (
+            self.snapshot is not None
+            and time.monotonic() - self.checked_at < self.check_interval
+        )
+
+    async def get(self) -> Snapshot:
+        if not self.is_fresh():
+            await self.refresh()
+        return self.snapshot
+
+    async def refresh(self, force: bool = False):
+        async with self.lock:
+            if self.is_fresh() and not force:
+                return
+
+            async with self.Session() as db:
+                result = await db.execute(self.version_query())
+                version = tuple(sorted(tuple(row) for row in result))
+                if force or self.snapshot is None or version != self.snapshot.version:
+                    rows = {}
+                    for model in TABLES:
+                        result = await db.scalars(select(model).order_by(model.id))
+                        rows[model] = result.all()
+                    self.snapshot = Snapshot(version, rows)
+                    self.reloads += 1
+            self.checked_at = time.monotonic()
+
+    def expire(self):
+        """Check the data version again on the next lookup."""
+        self.checked_at = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "version": self.snapshot and self.snapshot.version,
+            "reloads": self.reloads,
+            "check_interval": self.check_interval,
+        }
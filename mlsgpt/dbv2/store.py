@@ -1,131 +1,543 @@
 import os
 import h3
-import googlemaps
-from openai import OpenAI
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, or_, text
-
+import json
+import time
+import base64
+import asyncio
+import functools
+import contextlib
+import psycopg
+from decimal import Decimal
+from datetime import date
+from sqlalchemy.orm import (
+    sessionmaker,
+    selectinload,
+    joinedload,
+    contains_eager,
+    load_only,
+)
+from sqlalchemy import (
+    Float,
+    bindparam,
+    create_engine,
+    event,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from mlsgpt import metrics, querylog, tracing
 from mlsgpt.dbv2 import schema
 from mlsgpt.dbv2 import filters
+from mlsgpt.dbv2 import stats
+from mlsgpt.dbv2 import flight
+from mlsgpt.dbv2 import statements
 from mlsgpt.db import models
 
 DSN = "postgresql://{}:{}@{}:{}/{}"
+ASYNC_DSN = "postgresql+psycopg://{}:{}@{}:{}/{}"
 LIMIT = 30
-
-
-def create_session():
-    db_url = DSN.format(
+SEMANTIC_LIMIT = 20
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+VERSION_CHECK_INTERVAL = float(os.getenv("VERSION_CHECK_INTERVAL_SECONDS", 30))
+POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.getenv("POSTGRES_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.getenv("POSTGRES_POOL_PRE_PING", "true").lower() == "true"
+# executions of the same SQL on a connection before psycopg prepares it on the
+# server, "none" turns prepared statements off (e.g. behind pgbouncer)
+PREPARE_THRESHOLD = os.getenv("POSTGRES_PREPARE_THRESHOLD", "2")
+QUERY_CACHE_SIZE = int(os.getenv("SQLALCHEMY_QUERY_CACHE_SIZE", 500))
+# data loads announce themselves with NOTIFY mlsgpt_data_reloaded
+RELOAD_CHANNEL = "mlsgpt_data_reloaded"
+# served by the (COALESCE("LastUpdated", '-infinity') DESC, property_id DESC)
+# index, NULL LastUpdated sorts last
+LAST_UPDATED_DESC = (
+    filters.LAST_UPDATED.desc(),
+    schema.Property.property_id.desc(),
+)
+
+
+def create_db_url(dsn: str = DSN):
+    return dsn.format(
         os.getenv("POSTGRES_USER"),
         os.getenv("POSTGRES_PASSWORD"),
         os.getenv("POSTGRES_HOST"),
         os.getenv("POSTGRES_PORT"),
         os.getenv("POSTGRES_DB"),
     )
-    engine = create_engine(db_url)
-    Session = sessionmaker(bind=engine)
+
+
+def pool_options():
+    return dict(
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+
+
+@functools.cache
+def get_engine():
+    return create_engine(create_db_url(), **pool_options())
+
+
+def prepare_threshold() -> int | None:
+    if PREPARE_THRESHOLD.lower() == "none":
+        return None
+    return int(PREPARE_THRESHOLD)
+
+
+@functools.cache
+def get_async_engine():
+    engine = create_async_engine(
+        create_db_url(ASYNC_DSN),
+        query_cache_size=QUERY_CACHE_SIZE,
+        connect_args={"prepare_threshold": prepare_threshold()},
+        **pool_options(),
+    )
+    time_statements(engine.sync_engine)
+    count_compilations(engine.sync_engine)
+    return engine
+
+
+def explain(statement: str, params) -> list[str]:
+    # on the sync engine, so the plan never waits on the event loop
+    with get_engine().connect() as conn:
+        return list(conn.exec_driver_sql(statement, params).scalars())
+
+
+def time_statements(engine):
+    """Time every statement on the engine as a trace span and hand the slow
+    ones to querylog, tagged with the DataReader method that ran them."""
+
+    # the start time lives on the statement's execution context, so a statement
+    # that fails leaves nothing behind on the connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started_at = context._query_started_at
+        elapsed = time.perf_counter() - started_at
+        caller = metrics.query_method.get()
+        tracing.record("db.execute", started_at, method=caller)
+        if querylog.is_slow(elapsed):
+            querylog.report(statement, parameters, elapsed, caller, explain)
+
+
+# statements executed per compiled cache outcome, see count_compilations
+compile_cache = {"hit": 0, "miss": 0, "uncached": 0}
+COMPILE_CACHE_RESULTS = {"CACHE_HIT": "hit", "CACHE_MISS": "miss"}
+
+
+def count_compilations(engine):
+    """Count statements by whether their SQL came from the engine's compiled
+    cache. Plain text statements have nothing to cache and count as
+    uncached."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        result = COMPILE_CACHE_RESULTS.get(getattr(cache_hit, "name", ""), "uncached")
+        compile_cache[result] += 1
+        metrics.SQL_COMPILE_CACHE.labels(result).inc()
+
+
+def create_session():
+    Session = sessionmaker(bind=get_engine())
     return Session()
 
 
+def notify_reload():
+    with get_engine().connect() as conn:
+        conn.execute(
+            text("SELECT pg_notify(:channel, '')"), {"channel": RELOAD_CHANNEL}
+        )
+        conn.commit()
+
+
+async def listen_for_reloads(callback, log):
+    """Run callback on every reload notification. Every worker listens, so an
+    invalidation reaches all of them. Reconnects when the connection drops and
+    calls back after each (re)connect in case a notification was missed."""
+    while True:
+        try:
+            conn = await psycopg.AsyncConnection.connect(
+                create_db_url(), autocommit=True
+            )
+            async with conn:
+                await conn.execute(f"LISTEN {RELOAD_CHANNEL}")
+                callback()
+                async for _ in conn.notifies():
+                    callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning(f"Reload listener disconnected :: {e}")
+            await asyncio.sleep(5)
+
+
+def property_loader(fields: list[str] | None = None, rooms=selectinload):
+    """Loader options for listing queries. Without fields the mapped defaults
+    apply and heavy columns stay deferred, otherwise only the requested
+    columns are selected.
+
+    Rooms are loaded with the given strategy. Pages use selectinload (one
+    extra query whatever the page size), single rows use joinedload."""
+    options = []
+    if fields is not None:
+        # ListingID joins the rooms and LastUpdated builds the cursor
+        columns = sorted({"ListingID", "LastUpdated", *fields} - {"Rooms"})
+        options.append(load_only(*[getattr(schema.Property, c) for c in columns]))
+    if fields is None or "Rooms" in fields:
+        options.append(rooms(schema.Property.Rooms))
+    return options
+
+
+def export_columns(fields: list[str] | None = None):
+    """Property columns for an export, the non deferred ones by default.
+    Rooms are not exported."""
+    attrs = inspect(schema.Property).column_attrs
+    if fields is None:
+        return [attr.expression.label(attr.key) for attr in attrs if not attr.deferred]
+    return [attrs[name].expression.label(name) for name in fields if name in attrs]
+
+
+def dump_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dump_row(row) -> str:
+    """One NDJSON line for an export row."""
+    return json.dumps(dict(row), default=dump_default) + "\n"
+
+
+def listings_statement(fields: list[str] | None, shape: tuple):
+    """A page of listings for get_properties and search, see statements."""
+    return (
+        select(schema.Property)
+        .options(*property_loader(fields))
+        .where(*statements.where_clauses(shape))
+        .order_by(*LAST_UPDATED_DESC)
+        .limit(statements.LIMIT)
+        .offset(statements.OFFSET)
+    )
+
+
+def semantic_statement(fields: list[str] | None, shape: tuple):
+    embedding = bindparam("embedding", type_=schema.Embedding.Embedding.type)
+    similarity = 1.0 - schema.Embedding.Embedding.cosine_distance(embedding)
+    return (
+        select(schema.Property)
+        .options(*property_loader(fields))
+        .join(schema.Embedding)
+        .where(similarity >= bindparam("threshold", type_=Float))
+        .where(*statements.where_clauses(shape))
+        .order_by(*LAST_UPDATED_DESC)
+        .limit(statements.LIMIT)
+        .offset(statements.OFFSET)
+    )
+
+
+def nearby_statement(fields: list[str] | None, resolution: int, shape: tuple):
+    # the h3 rows are already joined for the filter, reuse them for the
+    # distance instead of loading them again
+    h3_column = getattr(schema.H3Index, f"H3IndexR{resolution:02}")
+    return (
+        select(schema.Property)
+        .join(schema.H3Index)
+        .options(
+            *property_loader(fields),
+            contains_eager(schema.Property.H3Indexes).load_only(h3_column),
+        )
+        .where(filters.nearby_template(resolution))
+        .where(*statements.where_clauses(shape))
+    )
+
+
+class DataVersion:
+    """Newest LastUpdated and property_id of the listings, both answered from
+    indexes, and the write counters of the listing and embedding tables, which
+    also move on deletes and on updates that keep LastUpdated. Rechecked at
+    most every check_interval seconds; on_change runs when a batch load moved
+    them."""
+
+    # every table a listings response reads, semantic search joins embeddings
+    TABLES = (
+        schema.Property,
+        schema.PropertyRooms,
+        schema.H3Index,
+        schema.Embedding,
+    )
+
+    def __init__(
+        self, Session, check_interval: float = VERSION_CHECK_INTERVAL, on_change=None
+    ):
+        self.Session = Session
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self.value = None
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return (
+            self.value is not None
+            and time.monotonic() - self.checked_at < self.check_interval
+        )
+
+    async def get(self) -> tuple:
+        if self.is_fresh():
+            return self.value
+
+        async with self.lock:
+            if self.is_fresh():
+                return self.value
+
+            query = select(
+                # the expression the keyset index is built on
+                func.max(filters.LAST_UPDATED),
+                func.max(schema.Property.property_id),
+            )
+            async with self.Session() as session:
+                newest = tuple((await session.execute(query)).one())
+                result = await session.execute(stats.write_counters(self.TABLES))
+                value = (*newest, *sorted(tuple(row) for row in result))
+            if self.value is not None and value != self.value and self.on_change:
+                self.on_change()
+            self.value, self.checked_at = value, time.monotonic()
+        return self.value
+
+    def expire(self):
+        self.checked_at = 0.0
+
+
+class Clients:
+    """External API clients, created on first use. Importing openai and
+    googlemaps is slow and neither is needed to start serving."""
+
+    @functools.cached_property
+    def llm(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI()
+
+    @functools.cached_property
+    def gmaps(self):
+        import googlemaps
+
+        return googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
+
+
 class DataReader(object):
     def __init__(self):
-        self.session = create_session()
-        self.session.expire_all()
-        self.llm = OpenAI()
-        self.gmaps = googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
-
-    def __enter__(self):
+        self.engine = get_async_engine()
+        self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.stats = stats.StatsCache(self.Session)
+        self.version = DataVersion(self.Session)
+        self.flights = flight.SingleFlight()
+        self.statements = statements.StatementCache()
+        self.clients = Clients()
+
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        await self.engine.dispose()
+
+    @contextlib.asynccontextmanager
+    async def begin_session(self):
+        """Every query gets a short-lived session of its own on the shared
+        pool, so a coalesced call never depends on one caller's request."""
+        async with self.Session() as session:
+            yield session
+        metrics.observe_pool(self.engine.pool)
+
+    async def fetch_all(self, statement, params: dict | None = None):
+        async with self.begin_session() as session:
+            with metrics.time_query(), tracing.span("db.fetch"):
+                result = (await session.scalars(statement, params)).unique().all()
+            # end the read transaction so the connection goes back to the pool
+            await session.commit()
+            return result
+
+    async def fetch_first(self, statement):
+        async with self.begin_session() as session:
+            with metrics.time_query(), tracing.span("db.fetch"):
+                result = (await session.scalars(statement)).unique().first()
+            await session.commit()
+            return result
+
+    async def notify_reload(self):
+        async with self.begin_session() as session:
+            await session.execute(
+                text("SELECT pg_notify(:channel, '')"), {"channel": RELOAD_CHANNEL}
+            )
+            await session.commit()
 
-    def geocode(self, address: str):
-        geo = self.gmaps.geocode(address)
+    @flight.coalesced
+    async def geocode(self, address: str):
+        # googlemaps has no async client, keep it off the event loop
+        with metrics.external_call("google_geocode"), tracing.span("google_geocode"):
+            geo = await asyncio.to_thread(self.clients.gmaps.geocode, address)
         return geo[0]["geometry"]["location"]
 
     def h3(self, lat: float, lng: float, resolution: int = 9):
         return h3.geo_to_h3(lat, lng, resolution)
 
-    def k_ring(self, address: str, resolution: int = 10, distance: int = 4):
-        lat, lng = self.geocode(address).values()
+    async def k_ring(self, address: str, resolution: int = 10, distance: int = 4):
+        location = await self.geocode(address)
+        lat, lng = location.values()
         index = h3.geo_to_h3(lat, lng, resolution)
         values = h3.k_ring(h3.geo_to_h3(lat, lng, resolution), distance)
         return values, index
 
-    def embed(self, data: str):
-        response = self.llm.embeddings.create(
-            input=data, model="text-embedding-3-small"
-        )
+    @flight.coalesced
+    async def embed(self, data: str):
+        with (
+            metrics.external_call("openai_embedding"),
+            tracing.span("openai_embedding"),
+        ):
+            response = await self.clients.llm.embeddings.create(
+                input=data, model="text-embedding-3-small"
+            )
         return response.data[0].embedding
 
-    def get_property(self, listing_id: int = None):
-        return (
-            self.session.query(schema.Property).filter_by(ListingID=listing_id).first()
+    @flight.coalesced
+    @metrics.reader_method
+    async def get_property(self, listing_id: int = None):
+        return await self.fetch_first(
+            select(schema.Property)
+            .options(*property_loader(rooms=joinedload))
+            .filter_by(ListingID=listing_id)
         )
 
-    def get_properties(self, limit: int = LIMIT, offset: int = 0):
-        return (
-            self.session.query(schema.Property)
-            .order_by(text('CAST("LastUpdated" AS TIMESTAMP) DESC'))
-            .limit(min(limit, 30))
-            .offset(offset)
-            .all()
+    @flight.coalesced
+    @metrics.reader_method
+    async def get_properties(
+        self,
+        limit: int = LIMIT,
+        offset: int = 0,
+        fields: list[str] | None = None,
+        cursor: str | None = None,
+    ):
+        shape, params = statements.where_params(cursor)
+        query = self.statements.get(
+            ("properties", statements.fields_key(fields), shape),
+            lambda: listings_statement(fields, shape),
+        )
+        return await self.fetch_all(
+            query, params | dict(limit=min(limit, LIMIT), offset=offset)
         )
 
-    def search(self, limit: int = LIMIT, offset: int = 0, **kwargs):
-        query = self.session.query(schema.Property)
-
-        for key, value in kwargs.items():
-            if value is None:
-                continue
-            query = query.filter(filters.filter_props(key, value))
+    @flight.coalesced
+    @metrics.reader_method
+    async def search(
+        self,
+        limit: int = LIMIT,
+        offset: int = 0,
+        fields: list[str] | None = None,
+        cursor: str | None = None,
+        **kwargs,
+    ):
+        shape, params = statements.where_params(cursor, **kwargs)
+        query = self.statements.get(
+            ("search", statements.fields_key(fields), shape),
+            lambda: listings_statement(fields, shape),
+        )
+        return await self.fetch_all(
+            query, params | dict(limit=min(limit, LIMIT), offset=offset)
+        )
 
-        return (
-            query.order_by(text('CAST("LastUpdated" AS TIMESTAMP) DESC'))
-            .limit(min(limit, LIMIT))
+    async def export(
+        self,
+        limit: int | None = None,
+        offset: int = 0,
+        fields: list[str] | None = None,
+        cursor: str | None = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        **kwargs,
+    ):
+        """Yield every matching listing as a plain row mapping. Rows come from a
+        server side cursor batch_size at a time, so memory stays flat however
+        many rows match. The export outlives the request, it always runs on a
+        session of its own."""
+        shape, params = statements.where_params(cursor, **kwargs)
+        query = (
+            select(*export_columns(fields))
+            .where(*statements.where_clauses(shape))
+            .order_by(*LAST_UPDATED_DESC)
+            .limit(limit)
             .offset(offset)
-            .all()
         )
+        async with self.Session() as session:
+            result = await session.stream(
+                query.execution_options(yield_per=batch_size), params
+            )
+            async for row in result.mappings():
+                yield row
 
-    def semantic_search(
-        self, query: str, limit: int = LIMIT, offset: int = 0, threshold: float = 0.45
+    @flight.coalesced
+    @metrics.reader_method
+    async def semantic_search(
+        self,
+        query: str,
+        limit: int = LIMIT,
+        offset: int = 0,
+        threshold: float = 0.45,
+        fields: list[str] | None = None,
+        cursor: str | None = None,
     ):
-        vector = self.embed(query)
-        return (
-            self.session.query(schema.Property)
-            .join(schema.Embedding)
-            .filter(
-                1.0 - schema.Embedding.Embedding.cosine_distance(vector) >= threshold
-            )
-            .order_by(text('CAST("LastUpdated" AS TIMESTAMP) DESC'))
-            .limit(min(limit, 20))
-            .offset(offset)
-            .all()
+        vector = await self.embed(query)
+        shape, params = statements.where_params(cursor)
+        statement = self.statements.get(
+            ("semantic_search", statements.fields_key(fields), shape),
+            lambda: semantic_statement(fields, shape),
+        )
+        params |= dict(
+            embedding=vector,
+            threshold=threshold,
+            limit=min(limit, SEMANTIC_LIMIT),
+            offset=offset,
         )
+        return await self.fetch_all(statement, params)
 
-    def search_nearby(
+    @flight.coalesced
+    @metrics.reader_method
+    async def search_nearby(
         self,
         address: str,
         limit: int = LIMIT,
         offset: int = 0,
         resolution: int = 10,
         distance: int = 10,
+        fields: list[str] | None = None,
         **kwargs,
     ):
 
         # get nearby properties first
-        values, address_h3_index = self.k_ring(address, resolution, distance)
-        condition = filters.filter_nearby(resolution, values)
-        query = (
-            self.session.query(schema.Property).join(schema.H3Index).filter(condition)
+        values, address_h3_index = await self.k_ring(address, resolution, distance)
+        shape, params = statements.where_params(**kwargs)
+        query = self.statements.get(
+            ("search_nearby", statements.fields_key(fields), resolution, shape),
+            lambda: nearby_statement(fields, resolution, shape),
         )
 
-        # filter by other conditions
-        for key, value in kwargs.items():
-            if value is None:
-                continue
-            query = query.filter(filters.filter_props(key, value))
-
         # compute the h3 distance for each property and sort by it
         def compute_distance(property):
             property_h3_index = getattr(
@@ -133,127 +545,66 @@ class DataReader(object):
             )
             return h3.h3_distance(address_h3_index, property_h3_index)
 
-        properties = query.all()
+        properties = await self.fetch_all(query, params | dict(cells=list(values)))
         properties_sorted = sorted(properties, key=compute_distance)
         properties_sorted = properties_sorted[offset : offset + limit]
         return properties_sorted
 
-    def get_stats_info(self):
-        return self.session.query(schema.StatsInfo).all()
+    async def get_stats_info(self):
+        snapshot = await self.stats.get()
+        return snapshot.info
 
-    def get_city_stats(self, city: list[str]):
-        city_condition = or_(
-            *[schema.CityStats.City.ilike(f"%{city}%") for city in city]
-        )
-        return self.session.query(schema.CityStats).filter(city_condition).all()
+    async def get_city_stats(self, city: list[str]):
+        snapshot = await self.stats.get()
+        return snapshot.lookup(schema.CityStats, city)
 
-    def get_city_type_stats(self, city: list[str], type: list[str]):
-        city_condition = or_(
-            *[schema.CityTypeStats.City.ilike(f"%{city}%") for city in city]
-        )
-        type_condition = or_(
-            *[schema.CityTypeStats.Type.ilike(f"%{type}%") for type in type]
-        )
-        return (
-            self.session.query(schema.CityTypeStats)
-            .filter(city_condition)
-            .filter(type_condition)
-            .all()
-        )
+    async def get_city_type_stats(self, city: list[str], type: list[str]):
+        snapshot = await self.stats.get()
+        return snapshot.lookup(schema.CityTypeStats, city, type)
 
-    def get_city_property_type_stats(self, city: list[str], property_type: list[str]):
-        city_condition = or_(
-            *[schema.CityPropertyTypeStats.City.ilike(f"%{city}%") for city in city]
-        )
-        property_type_condition = or_(
-            *[
-                schema.CityPropertyTypeStats.PropertyType.ilike(f"%{type}%")
-                for type in property_type
-            ]
-        )
-        return (
-            self.session.query(schema.CityPropertyTypeStats)
-            .filter(city_condition)
-            .filter(property_type_condition)
-            .all()
-        )
+    async def get_city_property_type_stats(
+        self, city: list[str], property_type: list[str]
+    ):
+        snapshot = await self.stats.get()
+        return snapshot.lookup(schema.CityPropertyTypeStats, city, property_type)
 
-    def get_city_owner_type_stats(self, city: list[str], ownership_type: list[str]):
-        city_condition = or_(
-            *[schema.CityOwnershipTypeStats.City.ilike(f"%{city}%") for city in city]
-        )
-        ownership_type_condition = or_(
-            *[
-                schema.CityOwnershipTypeStats.OwnershipType.ilike(f"%{type}%")
-                for type in ownership_type
-            ]
-        )
-        return (
-            self.session.query(schema.CityOwnershipTypeStats)
-            .filter(city_condition)
-            .filter(ownership_type_condition)
-            .all()
-        )
+    async def get_city_owner_type_stats(
+        self, city: list[str], ownership_type: list[str]
+    ):
+        snapshot = await self.stats.get()
+        return snapshot.lookup(schema.CityOwnershipTypeStats, city, ownership_type)
 
-    def get_city_construction_style_stats(
+    async def get_city_construction_style_stats(
         self, city: list[str], construction_style_attachment: list[str]
     ):
-        city_condition = or_(
-            *[
-                schema.CityConstructionStyleStats.City.ilike(f"%{city}%")
-                for city in city
-            ]
-        )
-        construction_style_condition = or_(
-            *[
-                schema.CityConstructionStyleStats.ConstructionStyleAttachment.ilike(
-                    f"%{type}%"
-                )
-                for type in construction_style_attachment
-            ]
-        )
-        return (
-            self.session.query(schema.CityConstructionStyleStats)
-            .filter(city_condition)
-            .filter(construction_style_condition)
-            .all()
+        snapshot = await self.stats.get()
+        return snapshot.lookup(
+            schema.CityConstructionStyleStats, city, construction_style_attachment
         )
 
-    def get_city_bedrooms_stats(self, city: list[str], bedrooms: list[str]):
-        city_condition = or_(
-            *[schema.CityBedroomsStats.City.ilike(f"%{city}%") for city in city]
-        )
-        bedrooms_condition = or_(
-            *[
-                schema.CityBedroomsStats.BedroomsTotal == bedrooms
-                for bedrooms in bedrooms
-            ]
-        )
-        return (
-            self.session.query(schema.CityBedroomsStats)
-            .filter(city_condition)
-            .filter(bedrooms_condition)
-            .all()
-        )
+    async def get_city_bedrooms_stats(self, city: list[str], bedrooms: list[int]):
+        snapshot = await self.stats.get()
+        return snapshot.lookup(schema.CityBedroomsStats, city, bedrooms)
 
 
 def add_user_to_db_function():
-    db = create_session()
+    Session = sessionmaker(bind=get_engine(), expire_on_commit=False)
 
     def _(user: models.User):
-        existing_user = (
-            db.query(schema.User).filter(schema.User.Email == user.email).first()
-        )
-        if existing_user:
-            return existing_user
+        with Session() as db, db.begin():
+            existing_user = (
+                db.query(schema.User).filter(schema.User.Email == user.email).first()
+            )
+            if existing_user:
+                return existing_user
 
-        db_user = schema.User(
-            Email=user.email,
-            Name=user.name,
-            EmailVerified=user.email_verified,
-        )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+            db_user = schema.User(
+                Email=user.email,
+                Name=user.name,
+                EmailVerified=user.email_verified,
+            )
+            db.add(db_user)
+            db.flush()
+            db.refresh(db_user)
 
     return _
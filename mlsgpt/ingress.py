@@ -1,9 +1,10 @@
 import os
-from pyngrok import ngrok, conf
 
 
 def start_ngrok(port: int):
     # ngrok http --domain=api.mlsgpt.docex.io 80
+    from pyngrok import ngrok, conf
+
     conf.get_default().auth_token = os.environ.get("NGROK_AUTH_TOKEN")
     url = ngrok.connect(port, bind_tls=True, domain="api.mlsgpt.docex.io").public_url
     return url
@@ -11,4 +12,6 @@ def start_ngrok(port: int):
 
 def stop_ngrok():
     """Stop the ngrok tunnel."""
+    from pyngrok import ngrok
+
     ngrok.disconnect()
@@ -0,0 +1,114 @@
+import os
+import asyncio
+import contextlib
+from collections import defaultdict
+
+from fastapi import HTTPException, status
+
+USER_CONCURRENCY = int(os.environ.get("API_USER_CONCURRENCY", 4))
+# the default matches the database pool, POSTGRES_POOL_SIZE + MAX_OVERFLOW
+GLOBAL_CONCURRENCY = int(os.environ.get("API_GLOBAL_CONCURRENCY", 15))
+QUEUE_SIZE = int(os.environ.get("API_QUEUE_SIZE", 30))
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("API_QUEUE_TIMEOUT_SECONDS", 5))
+RETRY_AFTER_SECONDS = int(os.environ.get("API_RETRY_AFTER_SECONDS", 2))
+# exports hold a connection for as long as the client reads, keep them few
+EXPORT_USER_CONCURRENCY = int(os.environ.get("API_EXPORT_USER_CONCURRENCY", 1))
+EXPORT_GLOBAL_CONCURRENCY = int(os.environ.get("API_EXPORT_GLOBAL_CONCURRENCY", 2))
+
+
+class AdmissionControl:
+    """Concurrency limits per user and per worker. A request over its user's
+    limit is refused with 429. Otherwise it waits for a global slot in a
+    bounded queue and is shed with 503 when the queue is full or the wait
+    times out."""
+
+    def __init__(
+        self,
+        user_limit: int = USER_CONCURRENCY,
+        global_limit: int = GLOBAL_CONCURRENCY,
+        queue_size: int = QUEUE_SIZE,
+        queue_timeout: float = QUEUE_TIMEOUT_SECONDS,
+        retry_after: int = RETRY_AFTER_SECONDS,
+    ):
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.slots = asyncio.Semaphore(global_limit)
+        self.users = defaultdict(int)
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = defaultdict(int)
+
+    def reject(self, reason: str, status_code: int, detail: str):
+        self.rejected[reason] += 1
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def acquire(self):
+        if not self.slots.locked():
+            await self.slots.acquire()
+            return
+
+        if self.waiting >= self.queue_size:
+            self.reject(
+                "queue_full",
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server is busy, try again later",
+            )
+
+        self.waiting += 1
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            self.reject(
+                "queue_timeout",
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server is busy, try again later",
+            )
+        finally:
+            self.waiting -= 1
+
+    @contextlib.asynccontextmanager
+    async def admit(self, key: str):
+        if self.users[key] >= self.user_limit:
+            self.reject(
+                "user_limit",
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many concurrent requests",
+            )
+
+        # queued requests count against the user too
+        self.users[key] += 1
+        try:
+            await self.acquire()
+            self.admitted += 1
+            self.running += 1
+            try:
+                yield
+            finally:
+                self.running -= 1
+                self.slots.release()
+        finally:
+            self.users[key] -= 1
+            if not self.users[key]:
+                del self.users[key]
+
+    def stats(self) -> dict:
+        return {
+            "user_limit": self.user_limit,
+            "global_limit": self.global_limit,
+            "queue_size": self.queue_size,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+        }
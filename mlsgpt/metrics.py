@@ -0,0 +1,158 @@
+import os
+import time
+import functools
+import contextlib
+import contextvars
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+# scrape ports, published only on the internal network
+TASKS_METRICS_PORT = int(os.environ.get("TASKS_METRICS_PORT", 9100))
+API_METRICS_PORT = int(os.environ.get("API_METRICS_PORT", 9101))
+
+REQUEST_LATENCY = Histogram(
+    "mlsgpt_http_request_duration_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "mlsgpt_http_requests_in_flight",
+    "API requests being handled",
+    multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = Histogram(
+    "mlsgpt_db_query_duration_seconds",
+    "Database query latency by DataReader method",
+    ["method"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "mlsgpt_db_pool_connections",
+    "Database pool connections by state",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+EXTERNAL_LATENCY = Histogram(
+    "mlsgpt_external_call_duration_seconds",
+    "Latency of calls to OpenAI and Google",
+    ["service"],
+)
+EXTERNAL_ERRORS = Counter(
+    "mlsgpt_external_call_errors_total",
+    "Failed calls to OpenAI and Google",
+    ["service"],
+)
+USER_INFO_CACHE = Counter(
+    "mlsgpt_user_info_cache_requests_total",
+    "UserInfoCache lookups, the hit ratio is hit / (hit + miss)",
+    ["result"],
+)
+STATEMENT_CACHE = Counter(
+    "mlsgpt_statement_cache_requests_total",
+    "Listing statements reused (hit) or built (miss) per filter shape",
+    ["result"],
+)
+SQL_COMPILE_CACHE = Counter(
+    "mlsgpt_sql_compile_cache_total",
+    "Statements executed by whether SQLAlchemy's compiled cache had their SQL",
+    ["result"],
+)
+SQS_MESSAGES = Counter(
+    "mlsgpt_sqs_messages_total",
+    "SQS messages handled per queue",
+    ["queue", "status"],
+)
+
+# DataReader method whose queries are being timed
+query_method = contextvars.ContextVar("query_method", default="unknown")
+
+
+def registry():
+    """The default registry, or one reading every worker's samples when
+    uvicorn runs several workers with PROMETHEUS_MULTIPROC_DIR set."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    combined = CollectorRegistry()
+    multiprocess.MultiProcessCollector(combined)
+    return combined
+
+
+def start_exporter(port: int = TASKS_METRICS_PORT):
+    """Serve /metrics from a background thread on a port of its own, kept off
+    the public API. Started in the API's parent process, it serves every
+    worker's samples through the multiprocess registry."""
+    start_http_server(port, registry=registry())
+
+
+def reader_method(method):
+    """Label the queries run by a DataReader method with its name."""
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = query_method.set(method.__name__)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            query_method.reset(token)
+
+    return wrapper
+
+
+def time_query():
+    return DB_QUERY_LATENCY.labels(query_method.get()).time()
+
+
+@contextlib.contextmanager
+def external_call(service: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_ERRORS.labels(service).inc()
+        raise
+    finally:
+        EXTERNAL_LATENCY.labels(service).observe(time.perf_counter() - start)
+
+
+def observe_pool(pool):
+    DB_POOL_CONNECTIONS.labels("checked_out").set(pool.checkedout())
+    DB_POOL_CONNECTIONS.labels("checked_in").set(pool.checkedin())
+    DB_POOL_CONNECTIONS.labels("overflow").set(max(pool.overflow(), 0))
+
+
+class MetricsMiddleware:
+    """Latency per route template and requests in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # the template keeps path parameters out of the labels
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, status).observe(
+                time.perf_counter() - start
+            )
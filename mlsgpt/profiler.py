@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import uuid
+import tempfile
+import threading
+from pathlib import Path
+from collections import Counter
+
+PROFILE_DIR = Path(
+    os.environ.get("PROFILE_DIR", Path(tempfile.gettempdir()) / "mlsgpt-profiles")
+)
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_INTERVAL_SECONDS", 0.001))
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Samples the stacks of every thread from a background thread while it
+    runs. Stacks are counted in the collapsed format read by flamegraph.pl
+    and speedscope, one `root;...;leaf count` line per stack.
+
+    The event loop thread is shared, so requests running at the same time as
+    the profiled one show up in the report as well."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.thread.ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def save(self, name: str) -> Path:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = PROFILE_DIR / f"{stamp}-{name}-{uuid.uuid4().hex[:8]}.folded"
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
@@ -0,0 +1,67 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mlsgpt import logger
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 250))
+EXPLAIN_SLOW_QUERIES = os.environ.get("EXPLAIN_SLOW_QUERIES", "false").lower() == "true"
+# explains waiting or running at once, slow queries past that are only logged
+MAX_PENDING_EXPLAINS = int(os.environ.get("MAX_PENDING_EXPLAINS", 2))
+
+log = logger.get_logger("slow-queries")
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+pending = threading.BoundedSemaphore(MAX_PENDING_EXPLAINS)
+
+
+# SQLAlchemy binds an IN list as name_1_1, name_1_2, ...
+EXPANDED_PARAM = re.compile(r"^(.+_\d+)_\d+$")
+
+
+def shape(value):
+    """Type and size of a bound value. IN lists show up as their length."""
+    if isinstance(value, dict):
+        shapes, expanded = {}, {}
+        for key, v in value.items():
+            if match := EXPANDED_PARAM.match(key):
+                expanded[match[1]] = expanded.get(match[1], 0) + 1
+            else:
+                shapes[key] = shape(v)
+        return shapes | {key: f"in[{n}]" for key, n in expanded.items()}
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, str):
+        return f"str[{len(value)}]"
+    return type(value).__name__
+
+
+def is_slow(elapsed: float) -> bool:
+    return elapsed * 1000 >= SLOW_QUERY_MS
+
+
+def report(statement: str, params, elapsed: float, caller: str, explain=None):
+    """Log a slow statement. With EXPLAIN_SLOW_QUERIES on, explain(statement,
+    params) runs on a background thread and its plan is logged after."""
+    log.warning(
+        f"Slow query {elapsed * 1000:.0f} ms in {caller} :: "
+        f"params {shape(params)} :: {' '.join(statement.split())}"
+    )
+    if explain is None or not EXPLAIN_SLOW_QUERIES:
+        return
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return
+    if not pending.acquire(blocking=False):
+        log.info(f"Explain skipped for {caller}, {MAX_PENDING_EXPLAINS} pending")
+        return
+
+    def run():
+        try:
+            plan = explain(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", params)
+            log.warning(f"Plan of slow query in {caller} ::\n" + "\n".join(plan))
+        except Exception as e:
+            log.error(f"Explain failed for {caller} :: {e}")
+        finally:
+            pending.release()
+
+    executor.submit(run)
@@ -1,29 +1,41 @@
 import json
 import time
-import boto3
+import functools
 from typing import Callable
-from mlsgpt import core, logger
+from mlsgpt import core, logger, metrics
 from mlsgpt.db import models, store
 
 
 DELAY_SECONDS = 120
 
-sqs = boto3.client("sqs")
 
+@functools.cache
+def sqs_client():
+    # boto3 is slow to import, load it with the first queue operation
+    import boto3
 
+    return boto3.client("sqs")
+
+
+@functools.cache
 def create_sqs_queue(queue_name, delay_seconds=0):
-    response = sqs.create_queue(
+    """Create the queue once per process, on first use rather than on import."""
+    response = sqs_client().create_queue(
         QueueName=queue_name, Attributes={"DelaySeconds": str(delay_seconds)}
     )
     return response["QueueUrl"]
 
 
-file_queue_url = create_sqs_queue("mls_process_file")
-result_queue_url = create_sqs_queue("mls_process_result", delay_seconds=DELAY_SECONDS)
+def file_queue_url():
+    return create_sqs_queue("mls_process_file")
+
+
+def result_queue_url():
+    return create_sqs_queue("mls_process_result", delay_seconds=DELAY_SECONDS)
 
 
 def publish_message(queue_url, message_body, delay_seconds=0):
-    sqs.send_message(
+    sqs_client().send_message(
         QueueUrl=queue_url, MessageBody=message_body, DelaySeconds=delay_seconds
     )
 
@@ -48,7 +60,9 @@ def process_file(
         if ret["OK"]:
             log.info(f"Page id: {page.id} page: {page.num}/{size} queued")
             publish_message(
-                result_queue_url, json.dumps({"id": _id}), delay_seconds=DELAY_SECONDS
+                result_queue_url(),
+                json.dumps({"id": _id}),
+                delay_seconds=DELAY_SECONDS,
             )
             log.info(
                 f"Page id: {page.id} page: {page.num}/{size} result: {_id[:8]}... published"
@@ -77,7 +91,7 @@ def process_result(
     if status in ["QUEUED", "RUNNING"]:
         log.info(f"Result id: {short_id}... status={status}")
         publish_message(
-            result_queue_url, req.model_dump_json(), delay_seconds=DELAY_SECONDS
+            result_queue_url(), req.model_dump_json(), delay_seconds=DELAY_SECONDS
         )
     elif status == "COMPLETED":
         log.info(f"Result id: {short_id}... success")
@@ -95,34 +109,45 @@ def poll_sqs_messages(
     *,
     writer: store.DataWriter | None = None,
 ):
+    import boto3
+
     sqs = boto3.client("sqs")
+    queue_name = queue_url.rsplit("/", 1)[-1]
     while True:
         response = sqs.receive_message(
             QueueUrl=queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=20
         )
         messages = response.get("Messages", [])
         for message in messages:
-            process_message_func(message["Body"], log, writer=writer)
+            try:
+                process_message_func(message["Body"], log, writer=writer)
+            except Exception:
+                metrics.SQS_MESSAGES.labels(queue_name, "failed").inc()
+                raise
             sqs.delete_message(
                 QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"]
             )
+            metrics.SQS_MESSAGES.labels(queue_name, "processed").inc()
 
 
 def run_tasks():
     log = logger.get_logger("task-service")
     writer = store.DataWriter(log=log)
 
+    metrics.start_exporter()
+    log.info(f"Metrics exporter started on port {metrics.TASKS_METRICS_PORT}")
+
     from threading import Thread
 
     Thread(
         target=poll_sqs_messages,
-        args=(result_queue_url, process_result, log),
+        args=(result_queue_url(), process_result, log),
         kwargs=dict(writer=writer),
     ).start()
     log.info("Result queue listener started")
     time.sleep(2)
 
-    Thread(target=poll_sqs_messages, args=(file_queue_url, process_file, log)).start()
+    Thread(target=poll_sqs_messages, args=(file_queue_url(), process_file, log)).start()
     log.info("File queue listener started")
     time.sleep(2)
 
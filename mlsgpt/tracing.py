@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import uuid
+import contextlib
+import contextvars
+from dataclasses import dataclass, field, asdict
+
+from starlette.datastructures import MutableHeaders
+
+from mlsgpt import logger
+
+# comma separated, console and/or file; nothing is exported when empty
+TRACE_EXPORTERS = os.environ.get("TRACE_EXPORTERS", "")
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+SERVER_TIMING = os.environ.get("TRACE_SERVER_TIMING", "true").lower() == "true"
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start: float
+    duration_ms: float = 0.0
+    attributes: dict = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    name: str
+    trace_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.time)
+    origin: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Span starts become milliseconds since the trace started."""
+        data = asdict(self)
+        for span in data["spans"]:
+            span["start"] = round((span["start"] - self.origin) * 1000, 3)
+        del data["origin"]
+        return data
+
+    def server_timing(self) -> str:
+        """Span durations summed by name, as a Server-Timing header value."""
+        totals = {}
+        for span in self.spans:
+            duration, count = totals.get(span.name, (0.0, 0))
+            totals[span.name] = (duration + span.duration_ms, count + 1)
+        return ", ".join(
+            f'{name};dur={duration:.1f};desc="{count}x"'
+            for name, (duration, count) in totals.items()
+        )
+
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def new_span(name: str, start: float, attributes: dict) -> Span:
+    parent = current_span.get()
+    return Span(
+        name=name,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent and parent.span_id,
+        start=start,
+        attributes=attributes,
+    )
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Time the block as a child of the current span. Does nothing outside a
+    traced request."""
+    trace = current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    current = new_span(name, time.perf_counter(), attributes)
+    token = current_span.set(current)
+    try:
+        yield current
+    finally:
+        current_span.reset(token)
+        current.duration_ms = (time.perf_counter() - current.start) * 1000
+        trace.spans.append(current)
+
+
+def record(name: str, start: float, **attributes):
+    """Add a span that started at perf_counter() time start and ends now, for
+    code timed by callbacks rather than a with block."""
+    trace = current_trace.get()
+    if trace is not None:
+        finished = new_span(name, start, attributes)
+        finished.duration_ms = (time.perf_counter() - start) * 1000
+        trace.spans.append(finished)
+
+
+class ConsoleExporter:
+    def __init__(self):
+        self.log = logger.get_logger("traces")
+
+    def export(self, trace: Trace):
+        self.log.info(f"{trace.name} [{trace.trace_id}] {trace.server_timing()}")
+
+
+class FileExporter:
+    """One JSON trace per line."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, trace: Trace):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(trace.to_dict()) + "\n")
+
+
+EXPORTER_TYPES = {"console": ConsoleExporter, "file": FileExporter}
+exporters = [
+    EXPORTER_TYPES[name.strip()]()
+    for name in TRACE_EXPORTERS.split(",")
+    if name.strip()
+]
+
+
+def add_exporter(exporter):
+    """Register anything with an export(trace) method."""
+    exporters.append(exporter)
+
+
+def export(trace: Trace):
+    for exporter in exporters:
+        try:
+            exporter.export(trace)
+        except Exception as e:
+            logger.get_logger("traces").error(f"Trace export failed :: {e}")
+
+
+class TracingMiddleware:
+    """Traces each request under a root span named after its route. The span
+    timings go out in a Server-Timing header and to the exporters once the
+    response is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (exporters or SERVER_TIMING):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(name=f"{scope['method']} {scope['path']}")
+        root = new_span("total", trace.origin, {})
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING:
+                root.duration_ms = (time.perf_counter() - root.start) * 1000
+                timing = f"total;dur={root.duration_ms:.1f}"
+                if trace.spans:
+                    timing = f"{trace.server_timing()}, {timing}"
+                MutableHeaders(scope=message).append("Server-Timing", timing)
+            await send(message)
+
+        trace_token = current_trace.set(trace)
+        span_token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_span.reset(span_token)
+            current_trace.reset(trace_token)
+            root.duration_ms = (time.perf_counter() - root.start) * 1000
+            trace.spans.append(root)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                trace.name = f"{scope['method']} {route}"
+            export(trace)
@@ -0,0 +1,25 @@
+-- Store "LastUpdated" and "ListingContractDate" with real types so listing
+-- queries can order by an index instead of casting and sorting every row.
+-- The USING clauses backfill the existing text values in the same rewrite.
+-- Loaders writing text through JDBC need stringtype=unspecified afterwards.
+BEGIN;
+
+ALTER TABLE rsbr.property
+ALTER COLUMN "LastUpdated" TYPE TIMESTAMP
+USING CAST(NULLIF(TRIM("LastUpdated"), '') AS TIMESTAMP);
+
+ALTER TABLE rsbr.property
+ALTER COLUMN "ListingContractDate" TYPE DATE
+USING CAST(NULLIF(TRIM("ListingContractDate"), '') AS DATE);
+
+COMMIT;
+
+-- matches ORDER BY COALESCE("LastUpdated", '-infinity') DESC, property_id DESC
+-- in dbv2.store. The keyset cursor compares the same row, so a page after a
+-- cursor is one range seek on this index.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyLastUpdatedKeyIndex
+ON rsbr.property USING btree (
+    COALESCE("LastUpdated", '-infinity') DESC, property_id DESC
+);
+
+ANALYZE rsbr.property;
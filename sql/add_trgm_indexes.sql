@@ -0,0 +1,30 @@
+-- Trigram indexes for the substring filters in dbv2.filters.filter_template.
+-- ILIKE '%term%' cannot use the btree indexes, pg_trgm GIN indexes can, and
+-- OR-ed terms on one column are combined with a BitmapOr.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyStreetAddressTrgmIndex
+ON rsbr.property USING gin ("StreetAddress" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyCityTrgmIndex
+ON rsbr.property USING gin ("City" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyPostalCodeTrgmIndex
+ON rsbr.property USING gin ("PostalCode" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyProvinceTrgmIndex
+ON rsbr.property USING gin ("Province" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyTypeTrgmIndex
+ON rsbr.property USING gin ("Type" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyPropertyTypeTrgmIndex
+ON rsbr.property USING gin ("PropertyType" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyOwnershipTypeTrgmIndex
+ON rsbr.property USING gin ("OwnershipType" gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS PropertyConstructionStyleAttachmentTrgmIndex
+ON rsbr.property USING gin ("ConstructionStyleAttachment" gin_trgm_ops);
+
+ANALYZE rsbr.property;
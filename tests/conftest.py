@@ -0,0 +1,147 @@
+import os
+
+# settings read at import, the database ones are never connected to
+for name, value in {
+    "GOOGLE_OAUTH_CLIENT_ID": "test",
+    "GOOGLE_OAUTH_CLIENT_SECRET": "test",
+    "OPENAPI_REDIRECT_URI": "http://localhost/callback",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+from datetime import datetime, timedelta
+
+import h3
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from mlsgpt import apiv2, auth
+from mlsgpt.db import models
+from mlsgpt.dbv2 import filters, schema, stats, store
+
+LISTINGS = 8
+ROOMS = 3
+# the oldest listings have no LastUpdated and sort after the dated ones
+UNDATED = 2
+USER = models.User(sub=1, email="test@example.com", name="test", email_verified=True)
+LOCATION = {"lat": 43.6532, "lng": -79.3832}
+
+
+class Geocoder:
+    def geocode(self, address):
+        return [{"geometry": {"location": LOCATION}}]
+
+
+def attach(path):
+    def connect(dbapi_conn, record):
+        dbapi_conn.execute(f"ATTACH DATABASE '{path}' AS rsbr")
+
+    return connect
+
+
+def load(url, connect):
+    engine = create_engine(url)
+    event.listen(engine, "connect", connect)
+    tables = [schema.Property, schema.PropertyRooms, schema.H3Index, *stats.DIMENSIONS]
+    schema.Base.metadata.create_all(engine, tables=[t.__table__ for t in tables])
+    with engine.begin() as conn:
+        # SQLite has no arrays, the table stays empty
+        conn.exec_driver_sql(
+            'CREATE TABLE rsbr.stats_info (id INTEGER PRIMARY KEY, "Attribute" TEXT,'
+            ' "Values" TEXT)'
+        )
+    now = datetime(2024, 6, 1)
+    with Session(engine) as session:
+        for i in range(1, LISTINGS + 1):
+            lat, lng = LOCATION["lat"] + i * 1e-4, LOCATION["lng"]
+            cells = {f"H3IndexR{r:02}": h3.geo_to_h3(lat, lng, r) for r in range(16)}
+            prop = schema.Property(
+                property_id=i,
+                ListingID=100 + i,
+                LastUpdated=(
+                    now - timedelta(hours=i) if i <= LISTINGS - UNDATED else None
+                ),
+                City="Toronto",
+                Type="House",
+                Price=500_000 + i,
+            )
+            prop.Rooms = [
+                schema.PropertyRooms(ListingID=100 + i, Type="Bedroom")
+                for _ in range(ROOMS)
+            ]
+            prop.H3Indexes = [schema.H3Index(ListingID=100 + i, **cells)]
+            session.add(prop)
+        session.commit()
+
+    # stand-in for the Postgres view the data version reads write counters from
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE pg_stat_user_tables (relid INTEGER, schemaname TEXT,"
+            " relname TEXT, n_tup_ins INTEGER, n_tup_upd INTEGER, n_tup_del INTEGER)"
+        )
+        conn.execute(
+            stats.PG_STAT_USER_TABLES.insert(),
+            [
+                dict(
+                    relid=relid,
+                    schemaname="rsbr",
+                    relname=model.__tablename__,
+                    n_tup_ins=LISTINGS,
+                    n_tup_upd=0,
+                    n_tup_del=0,
+                )
+                for relid, model in enumerate(
+                    (*store.DataVersion.TABLES, *stats.TABLES), 1
+                )
+            ],
+        )
+    engine.dispose()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The API on a SQLite copy of the listing tables, with the statements
+    each request runs collected in client.statements."""
+    connect = attach(tmp_path / "rsbr.db")
+    load(f"sqlite:///{tmp_path / 'main.db'}", connect)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'main.db'}")
+    event.listen(engine.sync_engine, "connect", connect)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def no_reloads(callback, log):
+        pass
+
+    monkeypatch.setattr(store, "get_async_engine", lambda: engine)
+    monkeypatch.setattr(store, "listen_for_reloads", no_reloads)
+    # SQLite has no = ANY(array), match the ring as an IN list instead
+    monkeypatch.setattr(
+        filters,
+        "nearby_template",
+        lambda resolution: getattr(schema.H3Index, f"H3IndexR{resolution:02}").in_(
+            bindparam("cells", expanding=True)
+        ),
+    )
+    apiv2.app.dependency_overrides[auth.get_current_user] = lambda: USER
+
+    with TestClient(apiv2.app) as test_client:
+        apiv2.reader.clients.gmaps = Geocoder()
+        # the data version is checked once per interval, not per request
+        test_client.portal.call(apiv2.reader.version.get)
+        test_client.engine = engine
+        test_client.statements = statements
+        yield test_client
+
+    apiv2.app.dependency_overrides.clear()
+    apiv2.result_cache.invalidate()
@@ -0,0 +1,58 @@
+from sqlalchemy import delete, update
+
+from mlsgpt import apiv2
+from mlsgpt.dbv2 import schema, stats
+
+PAGE = {"limit": 5}
+
+
+def test_unchanged_listings_answer_not_modified(client):
+    etag = client.post("/listings", json=PAGE).headers["etag"]
+
+    response = client.post("/listings", json=PAGE, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_delete_changes_the_etag(client):
+    etag = client.post("/listings", json=PAGE).headers["etag"]
+
+    async def delete_rooms():
+        # leaves the newest LastUpdated and property_id as they were
+        async with client.engine.begin() as conn:
+            await conn.execute(
+                delete(schema.PropertyRooms).where(
+                    schema.PropertyRooms.ListingID == 101
+                )
+            )
+            await conn.execute(
+                update(stats.PG_STAT_USER_TABLES)
+                .where(stats.PG_STAT_USER_TABLES.c.relname == "property_rooms")
+                .values(n_tup_del=stats.PG_STAT_USER_TABLES.c.n_tup_del + 1)
+            )
+
+    client.portal.call(delete_rooms)
+    apiv2.reader.version.expire()
+
+    response = client.post("/listings", json=PAGE, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["items"][0]["Rooms"] == []
+
+
+def test_embedding_load_changes_the_etag(client):
+    # semantic search shares the listings ETag and joins the embeddings
+    etag = client.post("/listings", json=PAGE).headers["etag"]
+
+    async def load_embeddings():
+        async with client.engine.begin() as conn:
+            await conn.execute(
+                update(stats.PG_STAT_USER_TABLES)
+                .where(stats.PG_STAT_USER_TABLES.c.relname == "embedding")
+                .values(n_tup_ins=stats.PG_STAT_USER_TABLES.c.n_tup_ins + 1)
+            )
+
+    client.portal.call(load_embeddings)
+    apiv2.reader.version.expire()
+
+    response = client.post("/listings", json=PAGE, headers={"If-None-Match": etag})
+    assert response.status_code == 200
@@ -0,0 +1,56 @@
+import json
+import contextlib
+
+import pytest
+
+from mlsgpt import apiv2
+from tests.conftest import LISTINGS, USER
+
+
+def test_export_streams_every_listing_and_frees_its_slot(client):
+    response = client.post("/listings/export", json={})
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == LISTINGS
+    assert apiv2.export_admission.running == 0
+    assert not apiv2.export_admission.users
+
+
+def test_second_export_of_a_user_is_refused(client):
+    slot = contextlib.AsyncExitStack()
+    # the user's first export is still streaming
+    client.portal.call(
+        slot.enter_async_context, apiv2.export_admission.admit(USER.email)
+    )
+    try:
+        response = client.post("/listings/export", json={})
+    finally:
+        client.portal.call(slot.aclose)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"]
+
+
+def test_export_applies_the_search_filters(client):
+    response = client.post("/listings/export", json={"city": ["toronto"], "limit": 3})
+    assert len(response.text.splitlines()) == 3
+
+    response = client.post("/listings/export", json={"city": ["ottawa"]})
+    assert response.text == ""
+
+
+def test_invalid_export_does_not_hold_a_slot(client):
+    response = client.post("/listings/export", json={"fields": ["nope"]})
+    assert response.status_code == 422
+    assert not apiv2.export_admission.users
+
+    response = client.post("/listings/export", json={})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == LISTINGS
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_export_limit_must_be_positive(client, limit):
+    response = client.post("/listings/export", json={"limit": limit})
+    assert response.status_code == 422
@@ -0,0 +1,44 @@
+import asyncio
+
+from mlsgpt import apiv2
+from tests.conftest import ROOMS
+
+
+def test_identical_concurrent_queries_share_one_call(client):
+    flights = apiv2.reader.flights
+    started, shared = flights.started, flights.shared
+
+    async def fetch_twice():
+        return await asyncio.gather(
+            apiv2.reader.get_properties(limit=3),
+            apiv2.reader.get_properties(limit=3),
+        )
+
+    client.statements.clear()
+    first, second = client.portal.call(fetch_twice)
+
+    assert first is second
+    assert all(len(prop.Rooms) == ROOMS for prop in first)
+    # one page, the property rows and their rooms, not two
+    assert len(client.statements) == 2
+    assert (flights.started - started, flights.shared - shared) == (1, 1)
+
+
+def test_identical_concurrent_geocodes_share_one_call(client):
+    calls = []
+
+    class Geocoder:
+        def geocode(self, address):
+            calls.append(address)
+            return [{"geometry": {"location": {"lat": 1.0, "lng": 2.0}}}]
+
+    apiv2.reader.clients.gmaps = Geocoder()
+
+    async def geocode_twice():
+        return await asyncio.gather(
+            apiv2.reader.geocode("union station"),
+            apiv2.reader.geocode("union station"),
+        )
+
+    assert client.portal.call(geocode_twice) == [{"lat": 1.0, "lng": 2.0}] * 2
+    assert calls == ["union station"]
@@ -0,0 +1,32 @@
+from tests.conftest import LISTINGS, UNDATED
+
+
+def test_cursor_walks_every_listing_once(client):
+    first = client.post("/listings", json={"limit": 5}).json()
+    assert first["num_items"] == 5
+    assert first["next_cursor"] is not None
+
+    rest = client.post(
+        "/listings", json={"limit": 5, "cursor": first["next_cursor"]}
+    ).json()
+    assert rest["num_items"] == LISTINGS - 5
+    # a short page is the last one
+    assert rest["next_cursor"] is None
+
+    # newest first, then the undated listings by descending property_id
+    dated = LISTINGS - UNDATED
+    order = [*range(1, dated + 1), *range(LISTINGS, dated, -1)]
+    seen = [item["ListingID"] for item in first["items"] + rest["items"]]
+    assert seen == [100 + i for i in order]
+
+
+def test_exact_last_page_is_followed_by_an_empty_one(client):
+    response = client.post("/listings", json={"limit": LISTINGS}).json()
+    assert response["num_items"] == LISTINGS
+    # the page is full, so the client is told to ask for more and gets nothing
+    assert response["next_cursor"] is not None
+    last = client.post(
+        "/listings", json={"limit": LISTINGS, "cursor": response["next_cursor"]}
+    ).json()
+    assert last["num_items"] == 0
+    assert last["next_cursor"] is None
@@ -0,0 +1,36 @@
+import pytest
+
+from tests.conftest import LISTINGS, ROOMS
+
+PAGE = 5
+# the property rows, then one selectin query for the rooms of the whole page
+STATEMENTS_PER_PAGE = 2
+
+
+@pytest.mark.parametrize(
+    "path, payload",
+    [
+        ("/listings", {"limit": PAGE}),
+        ("/listings/search", {"limit": PAGE, "city": ["toronto"], "type": ["house"]}),
+        ("/listings/search-nearby", {"limit": PAGE, "address": "union station"}),
+    ],
+)
+def test_statements_per_page(client, path, payload):
+    client.statements.clear()
+    response = client.post(path, json=payload)
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == PAGE
+    assert all(len(item["Rooms"]) == ROOMS for item in items)
+    assert len(client.statements) == STATEMENTS_PER_PAGE
+
+
+def test_statements_do_not_grow_with_page_size(client):
+    client.statements.clear()
+    client.post("/listings", json={"limit": 2})
+    small = len(client.statements)
+
+    client.statements.clear()
+    client.post("/listings", json={"limit": LISTINGS})
+    assert len(client.statements) == small
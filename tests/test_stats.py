@@ -0,0 +1,78 @@
+import pytest
+
+from mlsgpt import apiv2
+from mlsgpt.dbv2 import schema
+
+FIGURES = dict(
+    InventoryCount=10,
+    AveragePrice=750_000,
+    MedianPrice=700_000,
+    MinimumPrice=400_000,
+    MaximumPrice=1_200_000,
+    AverageDaysOnMarket=20,
+    MedianDaysOnMarket=18,
+    MinimumDaysOnMarket=1,
+    MaximumDaysOnMarket=90,
+    AveragePricePerSqft=800,
+)
+CITIES = ["Toronto", "North York", "East York", "Mississauga"]
+
+
+def rows() -> list:
+    return [
+        *(schema.CityStats(City=city, **FIGURES) for city in CITIES),
+        schema.CityTypeStats(City="Toronto", Type="House", **FIGURES),
+        schema.CityTypeStats(City="Toronto", Type="Townhouse", **FIGURES),
+        schema.CityTypeStats(City="Toronto", Type="Apartment", **FIGURES),
+        schema.CityTypeStats(City="Mississauga", Type="House", **FIGURES),
+        *(
+            schema.CityBedroomsStats(City="Toronto", BedroomsTotal=bedrooms, **FIGURES)
+            for bedrooms in (1, 3, 13)
+        ),
+    ]
+
+
+@pytest.fixture
+def snapshot(client):
+    """The stats snapshot reloaded with rows() in the stats tables."""
+
+    async def load():
+        async with apiv2.reader.Session() as session:
+            session.add_all(rows())
+            await session.commit()
+        await apiv2.reader.stats.refresh(force=True)
+        return apiv2.reader.stats.snapshot
+
+    return client.portal.call(load)
+
+
+def test_cities_match_as_substrings(snapshot):
+    rows = snapshot.lookup(schema.CityStats, ["YORK "])
+    assert sorted(row.City for row in rows) == ["East York", "North York"]
+
+
+def test_text_dimensions_match_as_substrings(snapshot):
+    rows = snapshot.lookup(schema.CityTypeStats, ["toronto"], ["house"])
+    assert sorted(row.Type for row in rows) == ["House", "Townhouse"]
+
+
+def test_bedrooms_match_exactly(snapshot):
+    rows = snapshot.lookup(schema.CityBedroomsStats, ["toronto"], [1, 3])
+    assert sorted(row.BedroomsTotal for row in rows) == [1, 3]
+
+
+def test_batch_returns_the_requested_dimensions(client, snapshot):
+    response = client.post(
+        "/stats/batch",
+        json={"city": ["mississauga"], "type": ["house"], "bedrooms": [3]},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["city"]["num_items"] == 1
+    assert body["city"]["items"][0]["City"] == "Mississauga"
+    assert body["type"]["num_items"] == 1
+    assert body["type"]["items"][0]["Type"] == "House"
+    assert body["bedrooms"] == {"num_items": 0, "items": []}
+    for name in ("property_type", "ownership_type", "construction_style_attachment"):
+        assert body[name] is None
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from mlsgpt import querylog
+from mlsgpt.dbv2 import store
+
+
+def test_failed_statements_leave_no_timer_behind(monkeypatch):
+    timed = []
+    monkeypatch.setattr(querylog, "is_slow", lambda elapsed: timed.append(elapsed))
+    engine = create_engine("sqlite://")
+    store.time_statements(engine)
+
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                conn.exec_driver_sql("SELECT * FROM missing")
+        conn.exec_driver_sql("SELECT 1")
+
+        assert len(timed) == 1
+        assert not conn.info